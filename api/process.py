@@ -9,6 +9,7 @@ import tempfile
 from collections import defaultdict
 import logging
 import traceback
+import time
 from io import BytesIO
 import openpyxl
 
@@ -48,13 +49,31 @@ except ImportError as e:
     convertDoor_available = False
 
 try:
-    from cutting_logic import process_cutting_data
+    from cutting_logic import process_cutting_data, reoptimize_cutting_data, aggregate_patterns, default_plan_cache
+    from timings import Timings, record as record_timings
     process_cutting_data_available = True
 except ImportError as e:
     print(f"Warning: Could not import process_cutting_data from cutting_logic: {e}")
     process_cutting_data = None
+    reoptimize_cutting_data = None
+    aggregate_patterns = None
+    default_plan_cache = None
     process_cutting_data_available = False
 
+try:
+    from remnants import RemnantStore, MIN_REMNANT_LENGTH
+except ImportError as e:
+    print(f"Warning: Could not import remnants: {e}")
+    RemnantStore = None
+
+# CUTTING_REMNANT_DB enables the remnant inventory; CUTTING_MIN_REMNANT is the shortest offcut worth storing
+REMNANT_DB_PATH = os.environ.get('CUTTING_REMNANT_DB')
+MIN_REMNANT = float(os.environ['CUTTING_MIN_REMNANT']) if os.environ.get('CUTTING_MIN_REMNANT') else None
+
+# Solve time limits in seconds, per request and per material group; groups that run out fall back to fast packing
+REQUEST_TIME_BUDGET = float(os.environ.get('CUTTING_TIME_BUDGET', '8'))
+GROUP_TIME_BUDGET = float(os.environ['CUTTING_GROUP_TIME_BUDGET']) if os.environ.get('CUTTING_GROUP_TIME_BUDGET') else None
+
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
@@ -65,17 +84,15 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
 
     def do_POST(self):
+        request_start = time.monotonic()
         try:
             # Check if required modules are available
             if not convertWindow_available or not convertDoor_available or not process_cutting_data_available:
                 self.send_error_response(500, "Required modules not available. Import error occurred.")
                 return
-                
-            # Set CORS headers
-            self.send_response(200)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
+
+            # Per-stage timings, returned in the response and the Server-Timing header
+            request_timings = Timings()
 
             # Parse the multipart form data
             content_type = self.headers.get('Content-Type', '')
@@ -84,45 +101,88 @@ class handler(BaseHTTPRequestHandler):
                 return
 
             # Parse form data
-            form = cgi.FieldStorage(
-                fp=self.rfile,
-                headers=self.headers,
-                environ={'REQUEST_METHOD': 'POST'}
-            )
+            with request_timings.timer('parse'):
+                form = cgi.FieldStorage(
+                    fp=self.rfile,
+                    headers=self.headers,
+                    environ={'REQUEST_METHOD': 'POST'}
+                )
+
+            # Incremental mode: previous result rows and attrs plus the positions of cancelled rows;
+            # the uploaded file then carries only the added orders and may be omitted when only cancelling
+            previous_result = form.getvalue('previousResult')
+            previous_attrs = json.loads(form.getvalue('previousAttrs', '{}'))
+            removed_rows = json.loads(form.getvalue('removedRows', '[]'))
 
             # Get file and process type
-            if 'file' not in form:
+            file_item = form['file'] if 'file' in form else None
+            if file_item is None and not previous_result:
                 self.send_error_response(400, "No file uploaded")
                 return
 
-            file_item = form['file']
-            if not file_item.filename:
-                self.send_error_response(400, "No file selected")
-                return
+            if file_item is not None and not file_item.filename:
+                if not previous_result:
+                    self.send_error_response(400, "No file selected")
+                    return
+                file_item = None
 
             process_type = form.getvalue('processType', 'Windows')
 
-            # Read file content directly into memory
-            file_content = file_item.file.read()
-            
-            # Save to temporary file for processing
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_item.filename)[1]) as tmp_file:
-                tmp_file.write(file_content)
-                tmp_file_path = tmp_file.name
+            # poolQty=true: offcuts left on each layer of stacked (Qty > 1) bars are reused for Qty-1 pieces
+            pool_qty = form.getvalue('poolQty', 'false').lower() == 'true'
+
+            tmp_file_path = None
+            if file_item is not None:
+                with request_timings.timer('parse'):
+                    # Read file content directly into memory
+                    file_content = file_item.file.read()
+
+                    # Save to temporary file for processing
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_item.filename)[1]) as tmp_file:
+                        tmp_file.write(file_content)
+                        tmp_file_path = tmp_file.name
 
             try:
-                # Process the file based on type
-                if process_type == 'Windows':
-                    df, _ = convertWindow.process_file(tmp_file_path)
-                else:  # Door
-                    df, _ = convertDoor.process_file(tmp_file_path)
-                
-                # Ensure file is closed before attempting to delete
-                import gc
-                gc.collect()
+                df = None
+                if tmp_file_path is not None:
+                    # Process the file based on type
+                    with request_timings.timer('convert'):
+                        if process_type == 'Windows':
+                            df, _ = convertWindow.process_file(tmp_file_path)
+                        else:  # Door
+                            df, _ = convertDoor.process_file(tmp_file_path)
+
+                    # Ensure file is closed before attempting to delete
+                    import gc
+                    gc.collect()
                 
-                # Process cutting data
-                success, message, result_df = process_cutting_data(df)
+                # Process cutting data within what is left of the request budget
+                time_budget = max(REQUEST_TIME_BUDGET - (time.monotonic() - request_start), 0)
+                if previous_result:
+                    previous_df = pd.DataFrame(json.loads(previous_result))
+                    # Stock lengths, remnants and stack tails of the previous bars only travel in attrs
+                    previous_df.attrs.update(previous_attrs)
+                    with request_timings.timer('optimize'):
+                        success, message, result_df = reoptimize_cutting_data(previous_df, df, removed_rows,
+                                                                              time_budget=time_budget,
+                                                                              group_time_budget=GROUP_TIME_BUDGET,
+                                                                              plan_cache=default_plan_cache,
+                                                                              pool_qty=pool_qty)
+                else:
+                    remnant_store = None
+                    if REMNANT_DB_PATH and RemnantStore is not None:
+                        remnant_store = RemnantStore(REMNANT_DB_PATH, MIN_REMNANT if MIN_REMNANT is not None
+                                                     else MIN_REMNANT_LENGTH)
+                    try:
+                        success, message, result_df = process_cutting_data(df, time_budget=time_budget,
+                                                                           group_time_budget=GROUP_TIME_BUDGET,
+                                                                           plan_cache=default_plan_cache,
+                                                                           remnant_store=remnant_store,
+                                                                           timings=request_timings,
+                                                                           pool_qty=pool_qty)
+                    finally:
+                        if remnant_store is not None:
+                            remnant_store.close()
                 
                 if not success:
                     self.send_error_response(400, message)
@@ -140,6 +200,7 @@ class handler(BaseHTTPRequestHandler):
                         return None
                     return obj
                 
+                serialize_start = time.perf_counter()
                 rows = result_df.to_dict('records')
                 # Convert numpy types and handle NaN values in each row
                 for row in rows:
@@ -147,13 +208,67 @@ class handler(BaseHTTPRequestHandler):
                         row[key] = convert_numpy_types(value)
                 
                 columns = list(result_df.columns)
+
+                # Saw job list: bars with the same cutting pattern merged into one row
+                patterns = aggregate_patterns(result_df).to_dict('records')
+                for pattern in patterns:
+                    for key, value in pattern.items():
+                        pattern[key] = [convert_numpy_types(item) for item in value] if isinstance(value, list) \
+                            else convert_numpy_types(value)
                 
+                # Bars used per material and stock length
+                material_usage = defaultdict(lambda: defaultdict(int))
+                for group in result_df.attrs.get('group_stats', []):
+                    stock_lengths = group.get('bar_stock_lengths') or [group['stock_length']] * group['bars']
+                    for stock_length in stock_lengths:
+                        # A stacked bar of a Qty-q group uses q physical bars
+                        material_usage[group['material']][str(float(stock_length))] += int(group['qty'])
+
                 # Calculate stats with proper type conversion
                 max_cutting_id = result_df['Cutting ID'].max() if 'Cutting ID' in result_df.columns else 0
                 stats = {
                     'total_pieces': len(rows),
                     'total_cuts': int(max_cutting_id) if max_cutting_id is not None and not pd.isna(max_cutting_id) else 0,
-                    'material_usage': {}
+                    'material_usage': {material: dict(usage) for material, usage in material_usage.items()},
+                    'deadline_groups': [
+                        {
+                            'material': group['material'],
+                            'qty': int(group['qty']),
+                            'bars': int(group['bars']),
+                            'lower_bound': int(group['lower_bound']),
+                            'gap': int(group['gap'])
+                        }
+                        for group in result_df.attrs.get('group_stats', [])
+                        if group['deadline_hit']
+                    ],
+                    'groups': [
+                        {
+                            'material': group['material'],
+                            'qty': int(group['qty']),
+                            'bars': int(group['bars']),
+                            'lower_bound': int(group['lower_bound']),
+                            'gap': int(group['gap']),
+                            'drop': float(group['waste']),
+                            'utilization': float(group.get('utilization', 0.0)),
+                            'solve_ms': round(float(group.get('solve_time', 0.0)) * 1000, 3),
+                            'distinct_lengths': int(group.get('distinct_lengths', 0)),
+                            'length_buckets': int(group.get('length_buckets', 0))
+                        }
+                        for group in result_df.attrs.get('group_stats', [])
+                    ],
+                    'plan_cache': default_plan_cache.stats(),
+                    'remnants_used': result_df.attrs.get('remnant_bars', []),
+                    'stack_tails_used': result_df.attrs.get('stack_tails', []),
+                    'default_length_materials': result_df.attrs.get('default_length_materials', []),
+                    'info_duplicates': df.attrs.get('info_duplicates', []) if df is not None else [],
+                    'info_missing': df.attrs.get('info_missing', []) if df is not None else []
+                }
+
+                # Per-bar records to send back as previousAttrs with the next incremental request
+                attrs = {
+                    key: [{field: convert_numpy_types(value) for field, value in record.items()}
+                          for record in result_df.attrs.get(key, [])]
+                    for key in ('bar_stock_lengths', 'remnant_bars', 'stack_tails')
                 }
                 
                 response_data = {
@@ -161,13 +276,32 @@ class handler(BaseHTTPRequestHandler):
                     'data': {
                         'rows': rows,
                         'columns': columns,
-                        'stats': stats
+                        'patterns': patterns,
+                        'stats': stats,
+                        'attrs': attrs
                     },
-                    'filename': file_item.filename
+                    'filename': file_item.filename if file_item is not None else None
                 }
-                
+                request_timings.add('serialize', time.perf_counter() - serialize_start)
+                request_timings.add('total', time.monotonic() - request_start)
+                response_data['data']['timings'] = request_timings.as_dict()
+
+                # JSON encoding happens after the timings block is built, so it only shows up
+                # in the Server-Timing header and the aggregated stats
+                with request_timings.timer('encode'):
+                    body = json.dumps(response_data).encode('utf-8')
+                record_timings(request_timings)
+                logging.info(f"Timings: {request_timings.server_timing_header()}")
+
                 try:
-                    self.wfile.write(json.dumps(response_data).encode('utf-8'))
+                    self.send_response(200)
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Content-Type', 'application/json')
+                    if request_timings.enabled:
+                        self.send_header('Server-Timing', request_timings.server_timing_header())
+                        self.send_header('Timing-Allow-Origin', '*')
+                    self.end_headers()
+                    self.wfile.write(body)
                 except (ConnectionAbortedError, BrokenPipeError) as conn_error:
                     logging.warning(f"Connection aborted while sending response: {conn_error}")
                     return  # Exit gracefully without raising exception
@@ -175,13 +309,12 @@ class handler(BaseHTTPRequestHandler):
             finally:
                 # Clean up temporary file with better error handling
                 try:
-                    if os.path.exists(tmp_file_path):
+                    if tmp_file_path is not None and os.path.exists(tmp_file_path):
                         # Force garbage collection to release file handles
                         import gc
                         gc.collect()
                         
                         # Try to delete the file, with retry logic for Windows
-                        import time
                         max_retries = 3
                         for attempt in range(max_retries):
                             try:
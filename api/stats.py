@@ -0,0 +1,48 @@
+from http.server import BaseHTTPRequestHandler
+import json
+import logging
+import os
+import sys
+
+# Add parent directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import timings
+
+try:
+    from cutting_logic import default_plan_cache
+except ImportError as e:
+    print(f"Warning: Could not import default_plan_cache from cutting_logic: {e}")
+    default_plan_cache = None
+
+
+class handler(BaseHTTPRequestHandler):
+    """Aggregated per-stage timings of this process (each serverless instance keeps its own)"""
+
+    def do_OPTIONS(self):
+        """Handle CORS preflight requests"""
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def do_GET(self):
+        try:
+            response_data = {
+                'success': True,
+                'timings_enabled': timings.TIMINGS_ENABLED,
+                'timings': timings.aggregate_stats(),
+                'plan_cache': default_plan_cache.stats() if default_plan_cache is not None else None
+            }
+            body = json.dumps(response_data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body)
+        except (ConnectionAbortedError, BrokenPipeError) as conn_error:
+            logging.warning(f"Connection aborted while sending stats: {conn_error}")
@@ -3,13 +3,11 @@ import pandas as pd
 import os
 import tempfile
 from io import BytesIO
-from collections import defaultdict
-import logging
 import traceback
 from datetime import datetime
 
 # 导入现有的处理模块
-from settings import get_material_length
+from cutting_logic import process_cutting_data, aggregate_patterns
 import convertWindow
 import convertDoor
 
@@ -182,164 +180,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def setup_logger():
-    """设置日志记录器"""
-    logger = logging.getLogger('cutting_process')
-    logger.setLevel(logging.INFO)
-    
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
-    return logger
-
-def find_best_combination(lengths, target_length, cut_loss=4, min_remaining=10):
-    lengths = sorted(lengths, reverse=True)
-    best_combination = []
-    best_remaining = target_length
-    current_combination = []
-    current_length = 0
-
-    def backtrack(index):
-        nonlocal best_combination, best_remaining, current_combination, current_length
-
-        # 如果当前组合比最佳组合更好，更新最佳组合
-        if len(current_combination) > 0 and target_length - current_length < best_remaining:
-            best_combination = current_combination.copy()
-            best_remaining = target_length - current_length
-
-        # 基本情况：已经考虑了所有长度或剩余长度小于最小要求
-        if index == len(lengths) or target_length - current_length < min_remaining:
-            return
-
-        # 尝试添加当前长度
-        if current_length + lengths[index] + cut_loss <= target_length:
-            current_combination.append(lengths[index])
-            current_length += lengths[index] + cut_loss
-            backtrack(index + 1)
-            current_combination.pop()
-            current_length -= lengths[index] + cut_loss
-
-        # 尝试不添加当前长度
-        backtrack(index + 1)
-
-    backtrack(0)
-    return best_combination
-
-def process_cutting_data(df):
-    """处理切割数据的核心函数"""
-    logger = setup_logger()
-    
-    try:
-        logger.info("开始处理数据")
-        
-        # 检查必要的列是否存在
-        required_columns = ['Material Name', 'Qty', 'Length', 'Order No', 'Bin No']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"数据中缺少必要的列: {', '.join(missing_columns)}")
-        
-        # 创建一个临时DataFrame进行排序和计算
-        temp_df = df.copy()
-        temp_df['original_index'] = temp_df.index
-        temp_df = temp_df.sort_values(['Material Name', 'Qty', 'Length', 'Order No', 'Bin No'], 
-                                      ascending=[True, True, False, True, True])
-        
-        cutting_info = defaultdict(list)
-        material_total_lengths = defaultdict(float)
-        material_max_cutting_id = defaultdict(int)
-        processed_rows = set()
-
-        for (material, qty), material_group in temp_df.groupby(['Material Name', 'Qty']):
-            material_length = get_material_length(material)
-            logger.info(f"处理材料 {material}，数量 {qty}，标准长度：{material_length}")
-            
-            all_lengths = material_group['Length'].tolist()
-            cutting_id = material_max_cutting_id[material] + 1
-            
-            while all_lengths:
-                best_combination = find_best_combination(all_lengths, material_length - 6, 4, 10)
-                remaining = material_length - sum(best_combination) - (len(best_combination) - 1) * 4 - 6
-                logger.debug(f"切割 ID {cutting_id} 的最佳组合: {best_combination}，剩余长度: {remaining}")
-                
-                # 如果没有找到有效组合，处理剩余的单个长度
-                if not best_combination:
-                    if all_lengths:
-                        # 取第一个剩余长度单独处理
-                        single_length = all_lengths[0]
-                        logger.warning(f"无法找到最佳组合，单独处理长度: {single_length}")
-                        
-                        # 查找对应的行
-                        unprocessed_rows = material_group[
-                            (material_group['Length'] == single_length) & 
-                            (~material_group.index.isin(processed_rows))
-                        ]
-                        
-                        if not unprocessed_rows.empty:
-                            row = unprocessed_rows.iloc[0]
-                            key = (row['Material Name'], row['Qty'], row['Length'], row['Order No'], row['Bin No'])
-                            cutting_info[(material, qty)].append((key, cutting_id, 1, row['original_index']))
-                            
-                            processed_rows.add(row.name)
-                            all_lengths.remove(single_length)
-                            material_total_lengths[(material, qty)] += single_length
-                            
-                            logger.debug(f"添加单独切割信息: 材料={material}, 长度={single_length}, 切割ID={cutting_id}")
-                        else:
-                            # 如果找不到对应行，直接移除以避免无限循环
-                            all_lengths.remove(single_length)
-                            logger.warning(f"未找到长度为 {single_length} 的未处理行，直接移除")
-                    
-                    cutting_id += 1
-                    continue
-                
-                for pieces_id, length in enumerate(best_combination, 1):
-                    unprocessed_rows = material_group[
-                        (material_group['Length'] == length) & 
-                        (~material_group.index.isin(processed_rows))
-                    ]
-                    
-                    if not unprocessed_rows.empty:
-                        row = unprocessed_rows.iloc[0]
-                        key = (row['Material Name'], row['Qty'], row['Length'], row['Order No'], row['Bin No'])
-                        cutting_info[(material, qty)].append((key, cutting_id, pieces_id, row['original_index']))
-                        
-                        processed_rows.add(row.name)
-                        all_lengths.remove(length)
-                        material_total_lengths[(material, qty)] += length
-                        
-                        logger.debug(f"添加切割信息: 材料={material}, 长度={length}, 切割ID={cutting_id}, 件数ID={pieces_id}")
-                    else:
-                        logger.warning(f"未找到长度为 {length} 的未处理行，跳过")
-                
-                cutting_id += 1
-            
-            material_max_cutting_id[material] = cutting_id - 1
-            logger.info(f"材料 {material}，数量 {qty} 处理完成，总长度: {material_total_lengths[(material, qty)]:.2f}")
-
-        logger.info("完成切割信息计算")
-
-        # 创建结果 DataFrame，保持原始顺序
-        result_df = df.copy()
-        result_df['Cutting ID'] = 0
-        result_df['Pieces ID'] = 0
-
-        # 填充 Cutting ID 和 Pieces ID
-        for (material, qty), info_list in cutting_info.items():
-            for (key, cutting_id, pieces_id, original_index) in info_list:
-                result_df.loc[original_index, 'Cutting ID'] = cutting_id
-                result_df.loc[original_index, 'Pieces ID'] = pieces_id
-
-        logger.info("完成 Cutting ID 和 Pieces ID 填充")
-        
-        return True, "数据处理成功", result_df
-    
-    except Exception as e:
-        logger.error(f"处理数据时出错: {str(e)}", exc_info=True)
-        return False, f"处理数据时出错: {str(e)}", None
-
 def process_uploaded_file(uploaded_file, process_type):
     """处理上传的文件"""
     tmp_file_path = None
@@ -374,11 +214,17 @@ def process_uploaded_file(uploaded_file, process_type):
             except Exception as cleanup_error:
                 st.warning(f"清理临时文件时出错: {str(cleanup_error)}")
 
-def convert_df_to_excel(df):
-    """将DataFrame转换为Excel格式的字节流"""
+def convert_df_to_excel(df, patterns_df=None):
+    """将DataFrame转换为Excel格式的字节流，patterns_df 不为空时写入第二个工作表 Patterns"""
     output = BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
         df.to_excel(writer, index=False, sheet_name='CutFrame')
+        if patterns_df is not None:
+            # 单元格不能存列表，Cutting IDs / Rows 写成逗号分隔的文本
+            patterns_df = patterns_df.copy()
+            for column in ('Cutting IDs', 'Rows'):
+                patterns_df[column] = patterns_df[column].map(lambda values: ', '.join(map(str, values)))
+            patterns_df.to_excel(writer, index=False, sheet_name='Patterns')
     return output.getvalue()
 
 def main():
@@ -536,6 +382,44 @@ def main():
                 ''', unsafe_allow_html=True)
         
         st.markdown("<br><br>", unsafe_allow_html=True)
+
+        # 各材料组用料与下界，差距为 0 时已是最优
+        group_stats = result_df.attrs.get('group_stats', [])
+        if group_stats:
+            st.markdown('''
+            <div style="margin-bottom: 1.5rem;">
+                <h3 style="color: #1e293b; font-weight: 600; margin-bottom: 1rem;">📐 用料与下界</h3>
+                <p style="color: #64748b; font-size: 0.9rem;">差距 = 用料根数 - 下界，差距为 0 表示该组已是最优</p>
+            </div>
+            ''', unsafe_allow_html=True)
+
+            summary_df = pd.DataFrame([
+                {
+                    '材料': group['material'],
+                    '数量': group['qty'],
+                    '用料根数': group['bars'],
+                    '下界': group['lower_bound'],
+                    '差距': group['gap'],
+                    '余料': round(group['waste'], 2),
+                    '利用率 (%)': group.get('utilization', 0.0)
+                }
+                for group in group_stats
+            ])
+            st.dataframe(summary_df, width='stretch', hide_index=True)
+
+            st.markdown("<br><br>", unsafe_allow_html=True)
+
+        # 相同切割方案合并后的锯床作业表
+        patterns_df = aggregate_patterns(result_df)
+        st.markdown('''
+        <div style="margin-bottom: 1.5rem;">
+            <h3 style="color: #1e293b; font-weight: 600; margin-bottom: 1rem;">🪚 切割方案</h3>
+            <p style="color: #64748b; font-size: 0.9rem;">方案相同的棒料合并为一行，按 Repeat 次数连续切割</p>
+        </div>
+        ''', unsafe_allow_html=True)
+        st.dataframe(patterns_df, width='stretch', hide_index=True)
+
+        st.markdown("<br><br>", unsafe_allow_html=True)
         
         # 显示数据预览
         st.markdown('''
@@ -568,7 +452,7 @@ def main():
             
             with download_col1:
                 # Excel下载
-                excel_data = convert_df_to_excel(result_df)
+                excel_data = convert_df_to_excel(result_df, patterns_df)
                 excel_filename = f"{os.path.splitext(processed_filename)[0]}_CutFrame.xlsx"
                 st.download_button(
                     label="📊 下载Excel文件",
@@ -0,0 +1,7 @@
+"""
+排料性能基准：固定种子生成测试数据，记录耗时、峰值内存、用料和余料
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks run --no-memory --output results.json   # 只计时，不测峰值内存
+    python -m benchmarks compare baseline.json results.json
+"""
@@ -0,0 +1,52 @@
+"""
+按固定种子生成接近实际订单的切割数据
+"""
+import random
+
+import pandas as pd
+
+# 与 material_settings.json 中的 HMST82 / HMST130 系列对应，后缀为颜色
+MATERIALS = [
+    'HMST82-01-WH', 'HMST82-02B-WH', 'HMST82-03-WH', 'HMST82-04-BL', 'HMST82-05-AL', 'HMST82-10-WH',
+    'HMST130-01-WH', 'HMST130-01-BL', 'HMST130-01-AL', 'HMST130-02-WH',
+]
+
+# 框料长度范围（英寸）
+MIN_LENGTH = 15.0
+MAX_LENGTH = 110.0
+
+
+def _frame_length(rng):
+    """订单尺寸换算出的框料长度，带有换算产生的小数"""
+    return round(rng.uniform(MIN_LENGTH, MAX_LENGTH), 4) + rng.choice([0.0, 0.33464759165848, 0.0625])
+
+
+def generate_pieces(pieces, seed=0, duplicate_ratio=0.5, materials=None):
+    """生成 pieces 行切割数据，列与 convertWindow.process_file 的输出一致
+
+    duplicate_ratio 为重复尺寸的比例：这部分长度从少量常用尺寸中抽取，
+    模拟同一批次里大量相同窗型的订单。
+    """
+    rng = random.Random(seed)
+    materials = materials or MATERIALS
+    common_lengths = [_frame_length(rng) for _ in range(max(pieces // 200, 5))]
+
+    rows = []
+    for i in range(pieces):
+        length = rng.choice(common_lengths) if rng.random() < duplicate_ratio else _frame_length(rng)
+        rows.append({
+            'Batch No': '',
+            'Order No': i // 4 + 1,
+            'Order Item': 1,
+            'Material Name': rng.choice(materials),
+            'Length': length,
+            'Angles': 'V',
+            'Qty': rng.choice([1, 1, 1, 2]),
+            'Bin No': i // 4 + 1,
+        })
+    return pd.DataFrame(rows)
+
+
+def generate_lengths(pieces, seed=0, duplicate_ratio=0.5):
+    """只生成长度列表，用于单根棒料求解器的基准"""
+    return generate_pieces(pieces, seed, duplicate_ratio, MATERIALS[:1])['Length'].tolist()
@@ -0,0 +1,176 @@
+"""
+运行基准并与基线比较
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from cutting_logic import END_TRIM, find_best_combination, process_cutting_data, bar_remaining
+from benchmarks.generator import generate_lengths, generate_pieces
+
+# 单根棒料求解：(solver, 长度数)
+COMBINATION_SCENARIOS = [
+    ('backtrack', 20),
+    ('subset_sum', 20),
+    ('subset_sum', 200),
+    ('bounded', 20),
+    ('bounded', 200),
+]
+
+# 整批排料：(行数, 重复尺寸比例, engine, solver)
+PROCESS_SCENARIOS = [
+    (100, 0.0, 'greedy', 'subset_sum'),
+    (100, 0.9, 'greedy', 'subset_sum'),
+    (100, 0.0, 'pattern', 'backtrack'),
+    (100, 0.0, 'bfd', 'backtrack'),
+    (1000, 0.0, 'greedy', 'subset_sum'),
+    (1000, 0.9, 'greedy', 'bounded'),
+    (1000, 0.5, 'pattern', 'backtrack'),
+    (1000, 0.5, 'bfd', 'backtrack'),
+    (10000, 0.9, 'greedy', 'bounded'),
+    (10000, 0.5, 'bfd', 'backtrack'),
+    (100000, 0.5, 'bfd', 'backtrack'),
+]
+
+# 基准使用的棒料长度（默认标准长度）
+BENCH_MATERIAL_LENGTH = 233.0
+
+
+def _measure(func, memory=True):
+    """运行两次：第一次计时，第二次用 tracemalloc 记录峰值内存（tracemalloc 会拖慢运行，不计入耗时）
+
+    memory 为 False 时只计时，峰值内存记为 None。
+    """
+    start = time.perf_counter()
+    result = func()
+    wall_time = time.perf_counter() - start
+    if not memory:
+        return result, wall_time, None
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, wall_time, peak
+
+
+def bench_combination(solver, pieces, seed=0, memory=True):
+    lengths = generate_lengths(pieces, seed)
+    combination, wall_time, peak = _measure(
+        lambda: find_best_combination(lengths, BENCH_MATERIAL_LENGTH - END_TRIM, solver=solver), memory)
+    return {
+        'name': f"combination/{solver}/n={pieces}",
+        'wall_time': wall_time,
+        'peak_memory': peak,
+        'bars': 1,
+        'waste': bar_remaining(combination, BENCH_MATERIAL_LENGTH) if combination else BENCH_MATERIAL_LENGTH,
+    }
+
+
+def bench_process(pieces, duplicate_ratio, engine, solver, seed=0, memory=True):
+    df = generate_pieces(pieces, seed, duplicate_ratio)
+    (success, message, result_df), wall_time, peak = _measure(
+        lambda: process_cutting_data(df, solver=solver, engine=engine), memory)
+    if not success:
+        raise RuntimeError(message)
+    group_stats = result_df.attrs['group_stats']
+    return {
+        'name': f"process/{engine}/{solver}/n={pieces}/dup={duplicate_ratio}",
+        'wall_time': wall_time,
+        'peak_memory': peak,
+        'bars': sum(group['bars'] for group in group_stats),
+        'waste': sum(group['waste'] for group in group_stats),
+    }
+
+
+def run(output, max_pieces=None, seed=0, memory=True):
+    results = []
+    for solver, pieces in COMBINATION_SCENARIOS:
+        results.append(bench_combination(solver, pieces, seed, memory))
+        print(f"{results[-1]['name']}: {results[-1]['wall_time']:.3f}s")
+    for pieces, duplicate_ratio, engine, solver in PROCESS_SCENARIOS:
+        if max_pieces is not None and pieces > max_pieces:
+            continue
+        results.append(bench_process(pieces, duplicate_ratio, engine, solver, seed, memory))
+        print(f"{results[-1]['name']}: {results[-1]['wall_time']:.3f}s，用料 {results[-1]['bars']} 根")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'seed': seed,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=4)
+    return report
+
+
+def compare(baseline_path, current_path, time_tolerance=0.2, memory_tolerance=0.2):
+    """返回回归列表：耗时或峰值内存超过基线的 (1 + tolerance) 倍，或用料、余料增加
+
+    任一方没有记录峰值内存（--no-memory）时不比较内存。
+    """
+    with open(baseline_path, 'r') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+    with open(current_path, 'r') as f:
+        current = {result['name']: result for result in json.load(f)['results']}
+
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['wall_time'] > base['wall_time'] * (1 + time_tolerance):
+            regressions.append(f"{name}: 耗时 {base['wall_time']:.3f}s -> {result['wall_time']:.3f}s")
+        if result['peak_memory'] is not None and base['peak_memory'] is not None \
+                and result['peak_memory'] > base['peak_memory'] * (1 + memory_tolerance):
+            regressions.append(f"{name}: 峰值内存 {base['peak_memory']} -> {result['peak_memory']} 字节")
+        if result['bars'] > base['bars']:
+            regressions.append(f"{name}: 用料 {base['bars']} -> {result['bars']} 根")
+        if result['waste'] > base['waste'] + 1e-6:
+            regressions.append(f"{name}: 余料 {base['waste']:.2f} -> {result['waste']:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='排料性能基准')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='运行全部基准并写入 JSON')
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--max-pieces', type=int, default=None, help='跳过行数超过该值的场景')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--no-memory', action='store_true',
+                            help='不用 tracemalloc 重跑测峰值内存，运行时间约减半')
+
+    compare_parser = subparsers.add_parser('compare', help='与基线比较，有回归时返回非零退出码')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--time-tolerance', type=float, default=0.2)
+    compare_parser.add_argument('--memory-tolerance', type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+    # 基准运行时屏蔽日志（setup_logger 每次调用都会把级别设回 INFO，这里全局屏蔽），
+    # 包括生成数据中未配置材料每次运行都会打印的警告
+    logging.disable(logging.WARNING)
+
+    if args.command == 'run':
+        run(args.output, args.max_pieces, args.seed, not args.no_memory)
+        return 0
+
+    regressions = compare(args.baseline, args.current, args.time_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(regression)
+    print(f"发现 {len(regressions)} 项回归" if regressions else "没有回归")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,14 @@ import csv
 import os
 import shutil
 
+from info_index import InfoIndex
+
+# Info 表的列，订单号在 B 列
+INFO_COLUMNS = {
+    'customer': 'A', 'width': 'D', 'height': 'E', 'frame': 'F', 'glass': 'G',
+    'argon': 'H', 'grid': 'I', 'note': 'K',
+}
+
 def get_material_color_suffix(note_value):
     """
     根据note字段内容确定材料颜色后缀
@@ -55,6 +63,8 @@ def process_file(xlsm_file):
         workbook = load_workbook(xlsm_file)
         frame_sheet = workbook["Frame,Sash"]
         info_sheet = workbook["Info"]
+        # 读一遍 Info 表建立订单号索引
+        info_index = InfoIndex(info_sheet.iter_rows(min_row=2, values_only=True), INFO_COLUMNS)
 
         batch_value = frame_sheet["B2"].value
 
@@ -75,32 +85,30 @@ def process_file(xlsm_file):
 
             if frame_length_value is not None:
 
-                # 在Info sheet中匹配door_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == door_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量door_customer_Value为该行第A列数据
-                        door_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量door_width_value为该行第D列内容
-                        door_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量door_height_value为该行第E列内容
-                        door_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量door_frame_value为该行第F列内容
-                        door_frame_value = info_sheet[f"F{info_row}"].value
-                        # 设置变量door_glass_value为该行G列内容
-                        door_glass_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量door_Argon_value为该行第H列内容
-                        door_Argon_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量door_grid_value为该行第I列内容
-                        door_grid_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量door_note_value为该行第K列内容
-                        door_note_value = info_sheet[f"K{info_row}"].value
-                        
-                        # 根据note字段设置材料名称的颜色后缀
-                        material_name = base_material_name + get_material_color_suffix(door_note_value)
-                        break
+                # 在Info索引中查找door_id_value对应的记录
+                info = info_index.get(door_id_value)
+                if info is not None:
+                    # 设置变量Info_ID_Line为记录所在行数
+                    Info_ID_Line = info['row']
+                    # 设置变量door_customer_Value为该行第A列数据
+                    door_customer_Value = info['customer']
+                    # 设置变量door_width_value为该行第D列内容
+                    door_width_value = info['width']
+                    # 设置变量door_height_value为该行第E列内容
+                    door_height_value = info['height']
+                    # 设置变量door_frame_value为该行第F列内容
+                    door_frame_value = info['frame']
+                    # 设置变量door_glass_value为该行G列内容
+                    door_glass_value = info['glass']
+                    # 设置变量door_Argon_value为该行第H列内容
+                    door_Argon_value = info['argon']
+                    # 设置变量door_grid_value为该行第I列内容
+                    door_grid_value = info['grid']
+                    # 设置变量door_note_value为该行第K列内容
+                    door_note_value = info['note']
+
+                    # 根据note字段设置材料名称的颜色后缀
+                    material_name = base_material_name + get_material_color_suffix(door_note_value)
 
                 
                 # 修改Material Name的值
@@ -124,32 +132,30 @@ def process_file(xlsm_file):
 
             if frame_length_value is not None:
 
-                # 在Info sheet中匹配door_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == door_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量door_customer_Value为该行第A列数据
-                        door_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量door_width_value为该行第D列内容
-                        door_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量door_height_value为该行第E列内容
-                        door_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量door_frame_value为该行第F列内容
-                        door_frame_value = info_sheet[f"F{info_row}"].value
-                        # 设置变量door_glass_value为该行G列内容
-                        door_glass_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量door_Argon_value为该行第H列内容
-                        door_Argon_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量door_grid_value为该行第I列内容
-                        door_grid_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量door_note_value为该行第K列内容
-                        door_note_value = info_sheet[f"K{info_row}"].value
-                        
-                        # 根据note字段设置材料名称的颜色后缀
-                        material_name = base_material_name + get_material_color_suffix(door_note_value)
-                        break
+                # 在Info索引中查找door_id_value对应的记录
+                info = info_index.get(door_id_value)
+                if info is not None:
+                    # 设置变量Info_ID_Line为记录所在行数
+                    Info_ID_Line = info['row']
+                    # 设置变量door_customer_Value为该行第A列数据
+                    door_customer_Value = info['customer']
+                    # 设置变量door_width_value为该行第D列内容
+                    door_width_value = info['width']
+                    # 设置变量door_height_value为该行第E列内容
+                    door_height_value = info['height']
+                    # 设置变量door_frame_value为该行第F列内容
+                    door_frame_value = info['frame']
+                    # 设置变量door_glass_value为该行G列内容
+                    door_glass_value = info['glass']
+                    # 设置变量door_Argon_value为该行第H列内容
+                    door_Argon_value = info['argon']
+                    # 设置变量door_grid_value为该行第I列内容
+                    door_grid_value = info['grid']
+                    # 设置变量door_note_value为该行第K列内容
+                    door_note_value = info['note']
+
+                    # 根据note字段设置材料名称的颜色后缀
+                    material_name = base_material_name + get_material_color_suffix(door_note_value)
 
 
                 writer.writerow([""]+ [door_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [f"{frame_length_value:.6f}"] + ["V"] + [material_pcs] +[door_id_value] * 1 + [""]  + ["TOP+BOT"] + [""] * 3 + [door_style_value] +[door_frame_value] + [""] * 1 + [""] + [door_grid_value] +[door_glass_value] + [door_Argon_value] + [""] *5 + [door_note_value] + [door_customer_Value])
@@ -167,32 +173,30 @@ def process_file(xlsm_file):
 
             if frame_length_value is not None:
 
-                # 在Info sheet中匹配door_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == door_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量door_customer_Value为该行第A列数据
-                        door_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量door_width_value为该行第D列内容
-                        door_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量door_height_value为该行第E列内容
-                        door_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量door_frame_value为该行第F列内容
-                        door_frame_value = info_sheet[f"F{info_row}"].value
-                        # 设置变量door_glass_value为该行G列内容
-                        door_glass_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量door_Argon_value为该行第H列内容
-                        door_Argon_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量door_grid_value为该行第I列内容
-                        door_grid_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量door_note_value为该行第K列内容
-                        door_note_value = info_sheet[f"K{info_row}"].value
-                        
-                        # 根据note字段设置材料名称的颜色后缀
-                        material_name = base_material_name + get_material_color_suffix(door_note_value)
-                        break
+                # 在Info索引中查找door_id_value对应的记录
+                info = info_index.get(door_id_value)
+                if info is not None:
+                    # 设置变量Info_ID_Line为记录所在行数
+                    Info_ID_Line = info['row']
+                    # 设置变量door_customer_Value为该行第A列数据
+                    door_customer_Value = info['customer']
+                    # 设置变量door_width_value为该行第D列内容
+                    door_width_value = info['width']
+                    # 设置变量door_height_value为该行第E列内容
+                    door_height_value = info['height']
+                    # 设置变量door_frame_value为该行第F列内容
+                    door_frame_value = info['frame']
+                    # 设置变量door_glass_value为该行G列内容
+                    door_glass_value = info['glass']
+                    # 设置变量door_Argon_value为该行第H列内容
+                    door_Argon_value = info['argon']
+                    # 设置变量door_grid_value为该行第I列内容
+                    door_grid_value = info['grid']
+                    # 设置变量door_note_value为该行第K列内容
+                    door_note_value = info['note']
+
+                    # 根据note字段设置材料名称的颜色后缀
+                    material_name = base_material_name + get_material_color_suffix(door_note_value)
 
 
                 writer.writerow([""]+ [door_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [f"{frame_length_value:.6f}"] + ["V"] + [material_pcs] +[door_id_value] * 1 + [""]  + ["Left+Right"] + [""] * 3 + [door_style_value] +[door_frame_value] + [""] * 1 + [""] + [door_grid_value] +[door_glass_value] + [door_Argon_value] + [""] *5 + [door_note_value] + [door_customer_Value])
@@ -210,43 +214,34 @@ def process_file(xlsm_file):
 
             if frame_length_value is not None:
 
-                # 在Info sheet中匹配door_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == door_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量door_customer_Value为该行第A列数据
-                        door_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量door_width_value为该行第D列内容
-                        door_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量door_height_value为该行第E列内容
-                        door_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量door_frame_value为该行第F列内容
-                        door_frame_value = info_sheet[f"F{info_row}"].value
-                        # 设置变量door_glass_value为该行G列内容
-                        door_glass_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量door_Argon_value为该行第H列内容
-                        door_Argon_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量door_grid_value为该行第I列内容
-                        door_grid_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量door_note_value为该行第K列内容
-                        door_note_value = info_sheet[f"K{info_row}"].value
-                        
-                        # 根据note字段设置材料名称的颜色后缀
-                        material_name = base_material_name + get_material_color_suffix(door_note_value)
-
-                            
-                            # 如果door_frame_value的值是'Retrofit-4'，则将material_pcs设为'2'
-                        if door_frame_value == 'Retrofit-4':
-                            material_pcs = '2'
-
-                        
-                        break
-
-
-                            
-
+                # 在Info索引中查找door_id_value对应的记录
+                info = info_index.get(door_id_value)
+                if info is not None:
+                    # 设置变量Info_ID_Line为记录所在行数
+                    Info_ID_Line = info['row']
+                    # 设置变量door_customer_Value为该行第A列数据
+                    door_customer_Value = info['customer']
+                    # 设置变量door_width_value为该行第D列内容
+                    door_width_value = info['width']
+                    # 设置变量door_height_value为该行第E列内容
+                    door_height_value = info['height']
+                    # 设置变量door_frame_value为该行第F列内容
+                    door_frame_value = info['frame']
+                    # 设置变量door_glass_value为该行G列内容
+                    door_glass_value = info['glass']
+                    # 设置变量door_Argon_value为该行第H列内容
+                    door_Argon_value = info['argon']
+                    # 设置变量door_grid_value为该行第I列内容
+                    door_grid_value = info['grid']
+                    # 设置变量door_note_value为该行第K列内容
+                    door_note_value = info['note']
+
+                    # 根据note字段设置材料名称的颜色后缀
+                    material_name = base_material_name + get_material_color_suffix(door_note_value)
+
+                    # 如果door_frame_value的值是'Retrofit-4'，则将material_pcs设为'2'
+                    if door_frame_value == 'Retrofit-4':
+                        material_pcs = '2'
 
                 writer.writerow([""]+ [door_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [f"{frame_length_value:.6f}"] + ["V"] + [material_pcs] +[door_id_value] * 1 + [""] + ["TOP+BOT"] + [""] * 3 + [door_style_value] +[door_frame_value] + [""] * 1 + [""] + [door_grid_value] +[door_glass_value] + [door_Argon_value] + [""] *5 + [door_note_value] + [door_customer_Value])
 
@@ -263,32 +258,30 @@ def process_file(xlsm_file):
 
             if frame_length_value is not None:
 
-                # 在Info sheet中匹配door_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == door_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量door_customer_Value为该行第A列数据
-                        door_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量door_width_value为该行第D列内容
-                        door_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量door_height_value为该行第E列内容
-                        door_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量door_frame_value为该行第F列内容
-                        door_frame_value = info_sheet[f"F{info_row}"].value
-                        # 设置变量door_glass_value为该行G列内容
-                        door_glass_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量door_Argon_value为该行第H列内容
-                        door_Argon_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量door_grid_value为该行第I列内容
-                        door_grid_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量door_note_value为该行第K列内容
-                        door_note_value = info_sheet[f"K{info_row}"].value
-                        
-                        # 根据note字段设置材料名称的颜色后缀
-                        material_name = base_material_name + get_material_color_suffix(door_note_value)
-                        break
+                # 在Info索引中查找door_id_value对应的记录
+                info = info_index.get(door_id_value)
+                if info is not None:
+                    # 设置变量Info_ID_Line为记录所在行数
+                    Info_ID_Line = info['row']
+                    # 设置变量door_customer_Value为该行第A列数据
+                    door_customer_Value = info['customer']
+                    # 设置变量door_width_value为该行第D列内容
+                    door_width_value = info['width']
+                    # 设置变量door_height_value为该行第E列内容
+                    door_height_value = info['height']
+                    # 设置变量door_frame_value为该行第F列内容
+                    door_frame_value = info['frame']
+                    # 设置变量door_glass_value为该行G列内容
+                    door_glass_value = info['glass']
+                    # 设置变量door_Argon_value为该行第H列内容
+                    door_Argon_value = info['argon']
+                    # 设置变量door_grid_value为该行第I列内容
+                    door_grid_value = info['grid']
+                    # 设置变量door_note_value为该行第K列内容
+                    door_note_value = info['note']
+
+                    # 根据note字段设置材料名称的颜色后缀
+                    material_name = base_material_name + get_material_color_suffix(door_note_value)
 
 
                 writer.writerow([""]+ [door_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [f"{frame_length_value:.6f}"] + ["V"] + [material_pcs] + [door_id_value] * 1 + [""] + ["Left+Right"] + [""] * 3 + [door_style_value] +[door_frame_value] + [""] * 1 + [""] + [door_grid_value] +[door_glass_value] + [door_Argon_value] + [""] *5 + [door_note_value] + [door_customer_Value])
@@ -305,29 +298,27 @@ def process_file(xlsm_file):
 
             if frame_length_value is not None:
 
-                # 在Info sheet中匹配door_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == door_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量door_customer_Value为该行第A列数据
-                        door_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量door_width_value为该行第D列内容
-                        door_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量door_height_value为该行第E列内容
-                        door_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量door_frame_value为该行第F列内容
-                        door_frame_value = info_sheet[f"F{info_row}"].value
-                        # 设置变量door_glass_value为该行G列内容
-                        door_glass_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量door_Argon_value为该行第H列内容
-                        door_Argon_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量door_grid_value为该行第I列内容
-                        door_grid_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量door_note_value为该行第K列内容
-                        door_note_value = info_sheet[f"K{info_row}"].value
-                        break
+                # 在Info索引中查找door_id_value对应的记录
+                info = info_index.get(door_id_value)
+                if info is not None:
+                    # 设置变量Info_ID_Line为记录所在行数
+                    Info_ID_Line = info['row']
+                    # 设置变量door_customer_Value为该行第A列数据
+                    door_customer_Value = info['customer']
+                    # 设置变量door_width_value为该行第D列内容
+                    door_width_value = info['width']
+                    # 设置变量door_height_value为该行第E列内容
+                    door_height_value = info['height']
+                    # 设置变量door_frame_value为该行第F列内容
+                    door_frame_value = info['frame']
+                    # 设置变量door_glass_value为该行G列内容
+                    door_glass_value = info['glass']
+                    # 设置变量door_Argon_value为该行第H列内容
+                    door_Argon_value = info['argon']
+                    # 设置变量door_grid_value为该行第I列内容
+                    door_grid_value = info['grid']
+                    # 设置变量door_note_value为该行第K列内容
+                    door_note_value = info['note']
 
 
                 if material_pcs == 4:
@@ -337,12 +328,17 @@ def process_file(xlsm_file):
         
 
 
+        info_index.report()
+
 # 在临时CSV文件写入完成后，添加排序逻辑
     # 关闭workbook以释放文件句柄
     workbook.close()
     
     df = pd.read_csv(temp_csv_file)
     df_sorted = df.sort_values(by=['Material Name', 'Qty', 'Length'], ascending=[True, True, False])
+    # Info 表中重复 / 找不到的订单号
+    df_sorted.attrs['info_duplicates'] = info_index.duplicates
+    df_sorted.attrs['info_missing'] = info_index.missing
     
     # 将排序后的数据写入最终的CSV文件
     # df_sorted.to_csv(csv_file, index=False, encoding='utf-8-sig')
@@ -1,5 +1,8 @@
 import pandas as pd
 from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+
+from info_index import InfoIndex
 import csv
 import os
 import shutil
@@ -17,6 +20,111 @@ def get_material_color_suffix(color_value):
             return '-AL'
     return '-WH'
 
+# Frame 表的各列块：(长度列, 数量列, 材料, 位置, 长度是否写成 6 位小数)，颜色在 O 列
+FRAME_BLOCKS = [
+    ('C', 'D', 'HMST82-02B', 'TOP+BOT', True),
+    ('E', 'F', 'HMST82-02B', 'LEFT+RIGHT', True),
+    ('G', 'H', 'HMST82-10', 'LEFT+RIGHT', False),
+    ('I', 'J', 'HMST82-10', 'LEFT+RIGHT', False),
+    ('K', 'L', 'HMST82-01', 'TOP+BOT', False),
+    ('M', 'N', 'HMST82-01', 'LEFT+RIGHT', False),
+]
+
+# Sash 表的各列块：(长度列, 数量列, 颜色列, 材料, 位置)，只取长度大于 14 的
+SASH_BLOCKS = [
+    ('C', 'D', 'H', 'HMST82-03', 'TOP+BOT'),
+    ('E', 'F', 'H', 'HMST82-03', 'LEFT+RIGHT'),
+    ('G', 'H', 'H', 'HMST82-05', 'LEFT+RIGHT'),
+    ('I', 'J', 'H', 'HMST82-04', 'TOP+BOT'),
+    ('K', 'L', 'O', 'HMST82-04', 'LEFT+RIGHT'),
+]
+
+# 数据从第 4 行开始（Info 表从第 2 行开始）
+FIRST_DATA_ROW = 4
+FIRST_INFO_ROW = 2
+
+# Info 表的列，订单号在 B 列
+INFO_COLUMNS = {
+    'customer': 'A', 'width': 'D', 'height': 'E', 'frame': 'G', 'glass': 'H',
+    'argon': 'I', 'grid': 'J', 'color': 'K', 'note': 'L',
+}
+
+
+def _column(letter):
+    """列字母转为行元组中的下标"""
+    return column_index_from_string(letter) - 1
+
+
+def _cell(row, letter):
+    """按列字母取行元组中的值，只读模式下行尾的空单元格可能不在元组里"""
+    index = _column(letter)
+    return row[index] if index < len(row) else None
+
+
+def _cut_row(batch_value, window_id_value, material_name, frame_length_value, material_pcs, position,
+             window_style_value, window_color_value, info):
+    """生成一行切割数据；Info 表中没有该订单时客户、框型、玻璃等留空"""
+    if info is not None:
+        window_customer_Value = info['customer']
+        window_frame_value = info['frame']
+        window_glass_value = info['glass']
+        window_Argon_value = info['argon']
+        window_grid_value = info['grid']
+        window_note_value = info['note']
+    else:
+        window_customer_Value = window_frame_value = window_glass_value = ""
+        window_Argon_value = window_grid_value = window_note_value = ""
+    return [batch_value] + [window_id_value] + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + [position] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value]
+
+
+def _frame_block_rows(frame_rows, info_index, batch_value):
+    """逐行读 Frame 表一次，按列块分别收集切割数据（输出仍按列块依次排列）"""
+    block_rows = [[] for _ in FRAME_BLOCKS]
+    for row in frame_rows:
+        window_id_value = _cell(row, 'A')
+        window_style_value = _cell(row, 'B')
+        info = None
+        info_found = False
+        for rows, (length_column, pcs_column, base_material_name, position, fixed) in zip(block_rows, FRAME_BLOCKS):
+            frame_length_value = _cell(row, length_column)
+            if frame_length_value is None:
+                continue
+            if not info_found:
+                info = info_index.get(window_id_value)
+                info_found = True
+            # Info 表中的颜色（K 列）优先，根据颜色设置材料名称的后缀
+            window_color_value = info['color'] if info is not None else _cell(row, 'O')
+            material_name = base_material_name + get_material_color_suffix(window_color_value)
+            rows.append(_cut_row(batch_value, window_id_value, material_name,
+                                 f"{frame_length_value:.6f}" if fixed else frame_length_value,
+                                 _cell(row, pcs_column), position, window_style_value, window_color_value, info))
+    return block_rows
+
+
+def _sash_block_rows(sash_rows, info_index, batch_value):
+    """逐行读 Sash 表一次，按列块分别收集切割数据；数量为 4 的拆成两行数量 2"""
+    block_rows = [[] for _ in SASH_BLOCKS]
+    for row in sash_rows:
+        window_id_value = _cell(row, 'A')
+        window_style_value = _cell(row, 'B')
+        info = None
+        info_found = False
+        for rows, (length_column, pcs_column, color_column, base_material_name, position) in zip(block_rows, SASH_BLOCKS):
+            frame_length_value = _cell(row, length_column)
+            if frame_length_value is None or float(frame_length_value) <= 14:
+                continue
+            if not info_found:
+                info = info_index.get(window_id_value)
+                info_found = True
+            window_color_value = info['color'] if info is not None else _cell(row, color_column)
+            material_name = base_material_name + get_material_color_suffix(window_color_value)
+            material_pcs = _cell(row, pcs_column)
+            for pcs in ([2, 2] if material_pcs == 4 else [material_pcs]):
+                rows.append(_cut_row(batch_value, window_id_value, material_name, frame_length_value, pcs,
+                                     position, window_style_value, window_color_value, info))
+    return block_rows
+
+
 def process_file(xlsm_file):
     # 获取文件名（不包含路径）
     file_name = os.path.basename(xlsm_file)
@@ -38,577 +146,25 @@ def process_file(xlsm_file):
         writer = csv.writer(csvfile, dialect="excel")
         writer.writerow(header)
 
-        # 打开xlsm文件
+        # 打开xlsm文件；只读模式下按单元格随机访问每次都要重新扫描工作表，
+        # 所以每个工作表只用 iter_rows 顺序读一遍
         workbook = load_workbook(xlsm_file, read_only=True, data_only=True)
-        frame_sheet = workbook["Frame"]
-        info_sheet = workbook["Info"]
-        sash_sheet = workbook["Sash"]
-
-        batch_value = frame_sheet["B2"].value
-
-        # ... (保留原有的处理逻辑，使用temp_csv_file替代csv_file)
-
-        # 创建字典来存储相同Material Name的行
-        material_rows = {}
-
-        # 从C列第4行开始遍历并写入写入8202B -
-        for row in range(4, frame_sheet.max_row + 1):
-            frame_length_value = frame_sheet[f"C{row}"].value
-            window_id_value = frame_sheet[f"A{row}"].value
-            window_style_value = frame_sheet[f"B{row}"].value
-            window_color_value = frame_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-02B'
-            material_pcs = frame_sheet[f"D{row}"].value
-
-            # 初始化所有变量，避免未定义错误
-            Info_ID_Line = None
-            window_customer_Value = ""
-            window_width_value = ""
-            window_height_value = ""
-            window_frame_value = ""
-            window_glass_value = ""
-            window_Argon_value = ""
-            window_grid_value = ""
-            window_note_value = ""
-
-            if frame_length_value is not None:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-                
-                
-                
-
-                writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [f"{frame_length_value:.6f}"] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1+ ["TOP+BOT"] + [""] * 3 + [window_style_value] +[window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] +[window_glass_value] + [window_Argon_value] + [""] *5 + [window_note_value] + [window_customer_Value])
-
-        
-        # 从E列第4行开始遍历并写入写入8202B |
-        for row in range(4, frame_sheet.max_row + 1):
-            frame_length_value = frame_sheet[f"E{row}"].value
-            window_id_value = frame_sheet[f"A{row}"].value
-            window_style_value = frame_sheet[f"B{row}"].value
-            window_color_value = frame_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-02B'
-            material_pcs = frame_sheet[f"F{row}"].value
-
-            if frame_length_value is not None:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [f"{frame_length_value:.6f}"] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1+ ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] +[window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] +[window_glass_value] + [window_Argon_value] + [""] *5 + [window_note_value] + [window_customer_Value])
-
-
-        
-        # 从G列第4行开始遍历并写入写入82-10 -
-        for row in range(4, frame_sheet.max_row + 1):
-            frame_length_value = frame_sheet[f"G{row}"].value
-            window_id_value = frame_sheet[f"A{row}"].value
-            window_style_value = frame_sheet[f"B{row}"].value
-            window_color_value = frame_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-10'
-            material_pcs = frame_sheet[f"H{row}"].value
-
-            # 初始化所有变量，避免未定义错误
-            Info_ID_Line = None
-            window_customer_Value = ""
-            window_width_value = ""
-            window_height_value = ""
-            window_frame_value = ""
-            window_glass_value = ""
-            window_Argon_value = ""
-            window_grid_value = ""
-            window_note_value = ""
-
-            if frame_length_value is not None:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1+ ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] +[window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] +[window_glass_value] + [window_Argon_value] + [""] *5 + [window_note_value] + [window_customer_Value])
-
-
-        # 从I列第4行开始遍历并写入写入8210 |
-        for row in range(4, frame_sheet.max_row + 1):
-            frame_length_value = frame_sheet[f"I{row}"].value
-            window_id_value = frame_sheet[f"A{row}"].value
-            window_style_value = frame_sheet[f"B{row}"].value
-            window_color_value = frame_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-10'
-            material_pcs = frame_sheet[f"J{row}"].value
-
-            # 初始化所有变量，避免未定义错误
-            Info_ID_Line = None
-            window_customer_Value = ""
-            window_width_value = ""
-            window_height_value = ""
-            window_frame_value = ""
-            window_glass_value = ""
-            window_Argon_value = ""
-            window_grid_value = ""
-            window_note_value = ""
-
-            if frame_length_value is not None:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] +[window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] +[window_glass_value] + [window_Argon_value] + [""] *5 + [window_note_value] + [window_customer_Value])
-
-
-        # 从K列第4行开始遍历并写入写入82-01 -
-        for row in range(4, frame_sheet.max_row + 1):
-            frame_length_value = frame_sheet[f"K{row}"].value
-            window_id_value = frame_sheet[f"A{row}"].value
-            window_style_value = frame_sheet[f"B{row}"].value
-            window_color_value = frame_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-01'
-            material_pcs = frame_sheet[f"L{row}"].value
-
-            # 初始化所有变量，避免未定义错误
-            Info_ID_Line = None
-            window_customer_Value = ""
-            window_width_value = ""
-            window_height_value = ""
-            window_frame_value = ""
-            window_glass_value = ""
-            window_Argon_value = ""
-            window_grid_value = ""
-            window_note_value = ""
-
-            if frame_length_value is not None:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1+ ["TOP+BOT"] + [""] * 3 + [window_style_value] +[window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] +[window_glass_value] + [window_Argon_value] + [""] *5 + [window_note_value] + [window_customer_Value])
-
-
-        # 从M列第4行开始遍历并写入写入8201 |
-        for row in range(4, frame_sheet.max_row + 1):
-            frame_length_value = frame_sheet[f"M{row}"].value
-            window_id_value = frame_sheet[f"A{row}"].value
-            window_style_value = frame_sheet[f"B{row}"].value
-            window_color_value = frame_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-01'
-            material_pcs = frame_sheet[f"N{row}"].value
-
-            # 初始化所有变量，避免未定义错误
-            Info_ID_Line = None
-            window_customer_Value = ""
-            window_width_value = ""
-            window_height_value = ""
-            window_frame_value = ""
-            window_glass_value = ""
-            window_Argon_value = ""
-            window_grid_value = ""
-            window_note_value = ""
-
-            if frame_length_value is not None:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] +[window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] +[window_glass_value] + [window_Argon_value] + [""] *5 + [window_note_value] + [window_customer_Value])
-
-
-        
-        #sash
-
-         # 从C列第4行开始遍历并写入82-03 一数据
-        for row in range(4, sash_sheet.max_row + 1):
-            frame_length_value = sash_sheet[f"C{row}"].value
-            window_id_value = sash_sheet[f"A{row}"].value
-            window_style_value = sash_sheet[f"B{row}"].value
-            window_color_value = sash_sheet[f"H{row}"].value
-            base_material_name = 'HMST82-03'
-            material_pcs = sash_sheet[f"D{row}"].value
-
-            if frame_length_value is not None and float(frame_length_value) >14:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                if material_pcs == 4:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["TOP+BOT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["TOP+BOT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])  
-                else:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["TOP+BOT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-        
-         # 从C列第4行开始遍历并写入82-03 |数据
-        for row in range(4, sash_sheet.max_row + 1):
-            frame_length_value = sash_sheet[f"E{row}"].value
-            window_id_value = sash_sheet[f"A{row}"].value
-            window_style_value = sash_sheet[f"B{row}"].value
-            window_color_value = sash_sheet[f"H{row}"].value
-            base_material_name = 'HMST82-03'
-            material_pcs = sash_sheet[f"F{row}"].value
-
-            if frame_length_value is not None and float(frame_length_value) >14:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                if material_pcs == 4:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])  
-                else:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-        
-
-        # 从C列第4行开始遍历并写入82-05 |数据
-        for row in range(4, sash_sheet.max_row + 1):
-            frame_length_value = sash_sheet[f"G{row}"].value
-            window_id_value = sash_sheet[f"A{row}"].value
-            window_style_value = sash_sheet[f"B{row}"].value
-            window_color_value = sash_sheet[f"H{row}"].value    
-            base_material_name = 'HMST82-05'
-            material_pcs = sash_sheet[f"H{row}"].value
-
-            if frame_length_value is not None and float(frame_length_value) >14:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                if material_pcs == 4:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])  
-                else:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-        
-
-
-        # 从C列第4行开始遍历并写入82-04 一 据
-        for row in range(4, sash_sheet.max_row + 1):
-            frame_length_value = sash_sheet[f"I{row}"].value
-            window_id_value = sash_sheet[f"A{row}"].value
-            window_style_value = sash_sheet[f"B{row}"].value
-            window_color_value = sash_sheet[f"H{row}"].value
-            base_material_name = 'HMST82-04'
-            material_pcs = sash_sheet[f"J{row}"].value
-
-            if frame_length_value is not None and float(frame_length_value) >14:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                if material_pcs == 4:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["TOP+BOT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["TOP+BOT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])  
-                else:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["TOP+BOT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-        
-
-
-        # 从C列第4行开始遍历并写入82-04 |数据
-        for row in range(4, sash_sheet.max_row + 1):
-            frame_length_value = sash_sheet[f"K{row}"].value
-            window_id_value = sash_sheet[f"A{row}"].value
-            window_style_value = sash_sheet[f"B{row}"].value
-            window_color_value = sash_sheet[f"O{row}"].value
-            base_material_name = 'HMST82-04'
-            material_pcs = sash_sheet[f"L{row}"].value
-
-            if frame_length_value is not None and float(frame_length_value) >14:
-
-                # 在Info sheet中匹配window_id_value，并获取相应的行数
-                for info_row in range(2, info_sheet.max_row + 1):
-                    info_id = info_sheet[f"B{info_row}"].value
-                    if info_id == window_id_value:
-                        # 设置变量Info_ID_Line为匹配行数
-                        Info_ID_Line = info_row
-                        # 设置变量window_customer_Value为该行第A列数据
-                        window_customer_Value = info_sheet[f"A{info_row}"].value
-                        # 设置变量window_width_value为该行第D列内容
-                        window_width_value = info_sheet[f"D{info_row}"].value
-                        # 设置变量window_height_value为该行第E列内容
-                        window_height_value = info_sheet[f"E{info_row}"].value
-                        # 设置变量window_frame_value为该行第G列内容
-                        window_frame_value = info_sheet[f"G{info_row}"].value
-                        # 设置变量window_glass_value为该行H列内容
-                        window_glass_value = info_sheet[f"H{info_row}"].value
-                        # 设置变量window_Argon_value为该行第I列内容
-                        window_Argon_value = info_sheet[f"I{info_row}"].value
-                        # 设置变量window_grid_value为该行第J列内容
-                        window_grid_value = info_sheet[f"J{info_row}"].value
-                        # 设置变量window_color_value为该行第K列内容
-                        window_color_value = info_sheet[f"K{info_row}"].value
-                        # 设置变量window_note_value为该行第L列内容
-                        window_note_value = info_sheet[f"L{info_row}"].value
-                        break
-
-                # 根据Color字段设置材料名称的颜色后缀
-                material_name = base_material_name + get_material_color_suffix(window_color_value)
-
-                if material_pcs == 4:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [2] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])  
-                else:
-                    writer.writerow([batch_value] + [window_id_value] * 1 + ["1"] + [material_name] + [""] * 2 + [frame_length_value] + ["V"] + [material_pcs] + [window_id_value] + [""] * 1 + ["LEFT+RIGHT"] + [""] * 3 + [window_style_value] + [window_frame_value] + [""] * 1 + [window_color_value] + [window_grid_value] + [window_glass_value] + [window_Argon_value] + [""] * 5 + [window_note_value] + [window_customer_Value])
-        
+        info_index = InfoIndex(workbook["Info"].iter_rows(min_row=FIRST_INFO_ROW, values_only=True),
+                               INFO_COLUMNS, first_row=FIRST_INFO_ROW)
 
+        frame_rows = workbook["Frame"].iter_rows(min_row=2, values_only=True)
+        batch_row = next(frame_rows, ())
+        batch_value = _cell(batch_row, 'B')
+        # 跳过第 3 行
+        next(frame_rows, None)
+        for rows in _frame_block_rows(frame_rows, info_index, batch_value):
+            writer.writerows(rows)
 
+        sash_rows = workbook["Sash"].iter_rows(min_row=FIRST_DATA_ROW, values_only=True)
+        for rows in _sash_block_rows(sash_rows, info_index, batch_value):
+            writer.writerows(rows)
 
+        info_index.report()
 
 # 在临时CSV文件写入完成后，添加排序逻辑
     # 关闭workbook以释放文件句柄
@@ -616,6 +172,9 @@ def process_file(xlsm_file):
     
     df = pd.read_csv(temp_csv_file)
     df_sorted = df.sort_values(by=['Material Name', 'Qty', 'Length'], ascending=[True, True, False])
+    # Info 表中重复 / 找不到的订单号
+    df_sorted.attrs['info_duplicates'] = info_index.duplicates
+    df_sorted.attrs['info_missing'] = info_index.missing
     
     # 将排序后的数据写入最终的CSV文件
     # df_sorted.to_csv(csv_file, index=False, encoding='utf-8-sig')
@@ -3,9 +3,19 @@ Core cutting logic extracted from app.py for use in API endpoints
 """
 import pandas as pd
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, deque, namedtuple, Counter, OrderedDict
+import hashlib
+import json
 import logging
-from settings import get_material_length
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+from settings import (get_material_length, get_material_stock_options, get_material_key, get_material_tolerance,
+                      resolve_material_lengths)
+from timings import NULL_TIMINGS
 
 
 def setup_logger():
@@ -22,15 +32,53 @@ def setup_logger():
     return logger
 
 
-def find_best_combination(lengths, target_length, cut_loss=4, min_remaining=10):
+# 每刀切割损耗、棒料修边长度、视为完美匹配的剩余长度
+CUT_LOSS = 4
+END_TRIM = 6
+MIN_REMAINING = 10
+
+# 搜索过程中每隔多少个节点检查一次截止时间
+DEADLINE_CHECK_INTERVAL = 1024
+
+# 子集和求解器的整数网格精度：每英寸 1000 格（1/1000"）
+SUBSET_SUM_RESOLUTION = 1000
+
+# 长度定点精度：每英寸 1000000 单位，与 convertWindow / convertDoor 写出的 6 位小数一致
+LENGTH_SCALE = 1000000
+
+
+def deadline_passed(deadline):
+    """deadline 为 time.monotonic() 时刻，None 表示不限时"""
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def find_best_combination(lengths, target_length, cut_loss=4, min_remaining=10, solver='backtrack',
+                          deadline=None):
+    """在 target_length 内寻找剩余长度最小的组合
+
+    solver 可选：
+    - 'backtrack'：逐个长度取/不取的回溯搜索（指数复杂度）
+    - 'subset_sum'：整数网格上的子集和，复杂度由棒料长度决定
+    - 'bounded'：按 (长度, 数量) 分组的分支定界，适合大量重复长度
+
+    到达 deadline 时停止搜索，返回目前找到的最佳组合。
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"未知的求解器: {solver}")
+    return SOLVERS[solver](lengths, target_length, cut_loss, min_remaining, deadline=deadline)
+
+
+def _find_best_combination_backtrack(lengths, target_length, cut_loss=4, min_remaining=10, deadline=None):
     lengths = sorted(lengths, reverse=True)
     best_combination = []
     best_remaining = target_length
     current_combination = []
     current_length = 0
+    nodes = 0
+    timed_out = False
 
     def backtrack(index):
-        nonlocal best_combination, best_remaining, current_combination, current_length
+        nonlocal best_combination, best_remaining, current_combination, current_length, nodes, timed_out
 
         # 如果当前组合比最佳组合更好，更新最佳组合
         if len(current_combination) > 0 and target_length - current_length < best_remaining:
@@ -41,6 +89,12 @@ def find_best_combination(lengths, target_length, cut_loss=4, min_remaining=10):
         if index == len(lengths) or target_length - current_length < min_remaining:
             return
 
+        # 超过截止时间时保留当前最佳组合，停止搜索
+        nodes += 1
+        if timed_out or (nodes % DEADLINE_CHECK_INTERVAL == 0 and deadline_passed(deadline)):
+            timed_out = True
+            return
+
         # 尝试添加当前长度
         if current_length + lengths[index] + cut_loss <= target_length:
             current_combination.append(lengths[index])
@@ -56,12 +110,1229 @@ def find_best_combination(lengths, target_length, cut_loss=4, min_remaining=10):
     return best_combination
 
 
-def process_cutting_data(df):
-    """处理切割数据的核心函数"""
+def _grid_weights(lengths, cut_loss=4, resolution=SUBSET_SUM_RESOLUTION):
+    """长度加切割损耗后向上取整到网格；配合向下取整的容量，选出的组合在实际长度上一定不超长"""
+    return np.ceil((np.asarray(lengths, dtype=float) + cut_loss) * resolution - 1e-9).astype(np.int64)
+
+
+def _grid_capacity(length, resolution=SUBSET_SUM_RESOLUTION):
+    """容量向下取整到网格"""
+    return int(np.floor(length * resolution + 1e-9))
+
+
+def _subset_sum_table(lengths, capacity, cut_loss=4, deadline=None, resolution=SUBSET_SUM_RESOLUTION):
+    """在整数网格上计算 lengths（降序）所有可达的占用长度
+
+    capacity 为网格单位的容量。返回 (weights, reachable, first_item)：
+    reachable[s] 表示占用 s 格可以恰好达到，first_item[s] 为第一次到达 s 时加入的长度下标。
+    表对容量以内的每个 s 都有效，同一张表可以回答所有更短棒料的最佳填充。
+    """
+    weights = _grid_weights(lengths, cut_loss, resolution)
+    reachable = np.zeros(capacity + 1, dtype=bool)
+    reachable[0] = True
+    first_item = np.full(capacity + 1, -1, dtype=np.int32)
+
+    for i, weight in enumerate(weights):
+        if weight > capacity:
+            continue
+        newly_reached = np.flatnonzero(reachable[:capacity + 1 - weight] & ~reachable[weight:]) + weight
+        reachable[newly_reached] = True
+        first_item[newly_reached] = i
+        # 已经完全填满，不可能更好；超时则用已加入的长度给出结果
+        if reachable[capacity] or deadline_passed(deadline):
+            break
+
+    return weights, reachable, first_item
+
+
+def _subset_sum_combination(lengths, weights, first_item, total):
+    """从 first_item 回溯出占用 total 格的组合，按降序返回"""
+    combination = []
+    while total > 0:
+        i = int(first_item[total])
+        combination.append(lengths[i])
+        total -= int(weights[i])
+    combination.reverse()
+    return combination
+
+
+def _find_best_combination_subset_sum(lengths, target_length, cut_loss=4, min_remaining=10, deadline=None,
+                                      resolution=SUBSET_SUM_RESOLUTION):
+    """把长度映射到整数网格后做子集和，返回与回溯相同的"剩余最小"组合
+
+    切割损耗并入每个长度，长度向上、目标向下取整到网格，每件最多多算一格，组合不会超长。
+    min_remaining 仅为保持接口一致，子集和总是求出最大填充。
+    """
+    lengths = sorted(lengths, reverse=True)
+    capacity = _grid_capacity(target_length, resolution)
+    if not lengths or capacity <= 0:
+        return []
+
+    weights, reachable, first_item = _subset_sum_table(lengths, capacity, cut_loss, deadline, resolution)
+    best_sum = int(np.flatnonzero(reachable)[-1])
+    return _subset_sum_combination(lengths, weights, first_item, best_sum)
+
+
+class _SubsetSumState:
+    """可以取走长度的子集和表，在同一组的多根棒料之间复用
+
+    counts[s] 为占用恰好 s 格的子集个数（对素数 MODULUS 取模，uint32 存储）：加入一个长度是一次移位相加，
+    取走一个长度按 weight 分块做逆运算，代价都是 O(容量)。
+    每根棒料只需扣掉上一根用掉的几个长度，不用对剩余长度从头重算整张表。
+    计数非零一定可达；可达而计数恰为模数倍数的概率约为十亿分之一，这时只会错过该占用，
+    不会给出不可行的组合（take 找不到组合时返回 None，由调用方重新求解）。
+    """
+
+    # 小于 2^30 的最大素数，两数相加不会溢出 uint32
+    MODULUS = 1073741789
+    # best_total 从高位往低位分块查找
+    SEARCH_BLOCK = 4096
+
+    def __init__(self, lengths, capacity, cut_loss=4, resolution=SUBSET_SUM_RESOLUTION):
+        self.capacity = capacity
+        self.cut_loss = cut_loss
+        self.resolution = resolution
+        self.counts = np.zeros(capacity + 1, dtype=np.uint32)
+        self.counts[0] = 1
+        self.remaining = Counter()
+        self._weights = {}
+        for length in lengths:
+            self.add(length)
+
+    def weight(self, length):
+        weight = self._weights.get(length)
+        if weight is None:
+            weight = self._weights[length] = int(_grid_weights([length], self.cut_loss, self.resolution)[0])
+        return weight
+
+    def add(self, length):
+        self.remaining[length] += 1
+        weight = self.weight(length)
+        if weight <= self.capacity:
+            # 模加：和小于 2 * MODULUS，减去 MODULUS 后若回绕成大数则取原值（无分支，比取模快得多）
+            total = self.counts[weight:] + self.counts[:self.capacity + 1 - weight]
+            self.counts[weight:] = np.minimum(total, total - np.uint32(self.MODULUS))
+
+    def remove(self, length):
+        self.remaining[length] -= 1
+        if self.remaining[length] == 0:
+            del self.remaining[length]
+        weight = self.weight(length)
+        if weight <= self.capacity:
+            # 逆运算依赖已还原的低位，按 weight 分块从低到高处理
+            counts = self.counts
+            for start in range(weight, self.capacity + 1, weight):
+                end = min(start + weight, self.capacity + 1)
+                # 模减：差回绕成大数时加上 MODULUS 后变小，取两者较小的一个
+                difference = counts[start:end] - counts[start - weight:end - weight]
+                counts[start:end] = np.minimum(difference, difference + np.uint32(self.MODULUS))
+
+    def lengths(self):
+        return sorted(self.remaining.elements(), reverse=True)
+
+    def best_total(self):
+        """容量以内可达到的最大占用（格）；最佳填充通常接近容量，从高位分块往下找"""
+        for end in range(self.capacity + 1, 0, -self.SEARCH_BLOCK):
+            start = max(end - self.SEARCH_BLOCK, 0)
+            reached = np.flatnonzero(self.counts[start:end])
+            if len(reached):
+                return start + int(reached[-1])
+        return 0
+
+    def best_at(self):
+        """best_at[c]：容量为 c 格时可达到的最大占用"""
+        return np.maximum.accumulate(np.where(self.counts != 0, np.arange(self.capacity + 1), 0))
+
+    def take(self, total):
+        """取出一个占用恰好 total 格的组合（长的优先，降序返回），并从表中扣掉；找不到返回 None"""
+        combination = []
+        while total > 0:
+            for length in sorted(self.remaining, reverse=True):
+                weight = self.weight(length)
+                if weight > total:
+                    continue
+                # 不含这一件时占用 total - weight 的子集个数：交错求和 counts[x] - counts[x - w] + ...
+                terms = self.counts[total - weight::-weight].tolist()
+                if (sum(terms[0::2]) - sum(terms[1::2])) % self.MODULUS:
+                    self.remove(length)
+                    combination.append(length)
+                    total -= weight
+                    break
+            else:
+                for length in combination:
+                    self.add(length)
+                return None
+        return combination
+
+
+def _find_best_combination_bounded(lengths, target_length, cut_loss=4, min_remaining=10, deadline=None):
+    """先把长度合并为 (长度, 数量)，再按每种长度取多少根做分支定界
+
+    相同长度只展开一次，用剩余长度总和作为填充上界剪枝，
+    剩余长度小于 min_remaining 时视为完美匹配并提前结束。
+    """
+    items = sorted(Counter(lengths).items(), reverse=True)
+    sizes = [length + cut_loss for length, _ in items]
+
+    # suffix_total[i]：从第 i 种长度起全部装入的占用长度，用作填充上界
+    suffix_total = [0] * (len(items) + 1)
+    for i in range(len(items) - 1, -1, -1):
+        suffix_total[i] = suffix_total[i + 1] + sizes[i] * items[i][1]
+
+    best_fill = 0
+    best_taken = None
+    taken = [0] * len(items)
+    nodes = 0
+    timed_out = False
+
+    def branch(index, current_length):
+        nonlocal best_fill, best_taken, nodes, timed_out
+
+        if current_length > best_fill:
+            best_fill = current_length
+            best_taken = taken.copy()
+
+        if index == len(items) or target_length - best_fill < min_remaining:
+            return
+
+        nodes += 1
+        if timed_out or (nodes % DEADLINE_CHECK_INTERVAL == 0 and deadline_passed(deadline)):
+            timed_out = True
+            return
+
+        # 上界：剩余长度全部装入也无法超过当前最佳
+        if min(target_length, current_length + suffix_total[index]) <= best_fill:
+            return
+
+        size = sizes[index]
+        max_take = min(items[index][1], int((target_length - current_length) // size))
+        while max_take > 0 and current_length + max_take * size > target_length:
+            max_take -= 1
+
+        for count in range(max_take, -1, -1):
+            taken[index] = count
+            branch(index + 1, current_length + count * size)
+            if target_length - best_fill < min_remaining or timed_out:
+                break
+        taken[index] = 0
+
+    branch(0, 0)
+
+    if best_taken is None:
+        return []
+    return [length for (length, _), count in zip(items, best_taken) for _ in range(count)]
+
+
+SOLVERS = {
+    'backtrack': _find_best_combination_backtrack,
+    'subset_sum': _find_best_combination_subset_sum,
+    'bounded': _find_best_combination_bounded,
+}
+
+
+def bar_remaining(bar, material_length):
+    """计算一根棒料切完 bar 中所有长度后的剩余长度"""
+    return material_length - sum(bar) - (len(bar) - 1) * CUT_LOSS - END_TRIM
+
+
+def group_lower_bound(lengths, material_length):
+    """材料组所需棒料数的简单下界 L1：总占用长度除以棒料可用长度后向上取整"""
+    capacity = material_length - END_TRIM
+    oversized = sum(1 for length in lengths if length + CUT_LOSS > capacity)
+    total = sum(length + CUT_LOSS for length in lengths if length + CUT_LOSS <= capacity)
+    return oversized + int(np.ceil(total / capacity - 1e-9))
+
+
+def group_lower_bound_l2(lengths, material_length):
+    """Martello-Toth 下界 L2，不低于 L1
+
+    对每个阈值 K（0 和不超过半根的占用长度）：占用超过 C-K 的各占一根，
+    占用在 (C/2, C-K] 的也各占一根，[K, C/2] 的只能放进这些棒料的剩余空间或新棒料。
+    排序后用前缀和计算，复杂度 O(n log n)。
+    """
+    capacity = material_length - END_TRIM
+    sizes = np.sort(np.asarray(lengths, dtype=np.float64) + CUT_LOSS)
+    if len(sizes) == 0:
+        return 0
+    prefix = np.concatenate(([0.0], np.cumsum(sizes)))
+    half = np.searchsorted(sizes, capacity / 2, side='right')
+
+    thresholds = np.unique(np.concatenate(([0.0], sizes[:half])))
+    # 各阈值下三类长度在排序数组中的分界
+    small_start = np.searchsorted(sizes, thresholds, side='left')
+    large_start = np.searchsorted(sizes, capacity - thresholds, side='right')
+    large_count = len(sizes) - large_start
+    medium_count = large_start - half
+    medium_free = medium_count * capacity - (prefix[large_start] - prefix[half])
+    small_total = prefix[half] - prefix[small_start]
+    extra = np.ceil(np.maximum(small_total - medium_free, 0) / capacity - 1e-9)
+    bound = int((large_count + medium_count + extra).max())
+    return max(bound, group_lower_bound(lengths, material_length))
+
+
+def _remove_lengths(lengths, used):
+    """一次遍历从 lengths 中去掉 used 里的每个长度（各去掉一次），保持原顺序"""
+    used = Counter(used)
+    kept = []
+    for length in lengths:
+        if used[length] > 0:
+            used[length] -= 1
+        else:
+            kept.append(length)
+    return kept
+
+
+# 长度数不少于该值时，subset_sum 逐根排料改用可复用的子集和表。
+# 生成数据实测（233" 棒料，重复尺寸 0 / 50% / 90%，各 5 个种子）：150 根以下每根重新求解更快，
+# 200 根时两者接近（重复尺寸多时仍略慢），300 根起子集和表快 3 倍以上
+INCREMENTAL_MIN_PIECES = 250
+
+
+def _plan_group_greedy(lengths, material_length, solver='backtrack', deadline=None):
+    """逐根棒料求最佳组合，直到所有长度都被分配，返回每根棒料上的长度列表
+
+    到达 deadline 后，剩余长度改用 Best-Fit-Decreasing 快速排料。
+    solver 为 'subset_sum' 且长度不少于 INCREMENTAL_MIN_PIECES（几百根）时整组共用一张子集和表
+    （见 _plan_group_greedy_subset_sum）；长度较少时建表和逐根扣减的开销更大，每根重新求解更快。
+    """
+    if solver == 'subset_sum' and len(lengths) >= INCREMENTAL_MIN_PIECES:
+        return _plan_group_greedy_subset_sum(lengths, material_length, deadline)
+
+    logger = setup_logger()
+    remaining_lengths = sorted(lengths, reverse=True)
+    bars = []
+
+    while remaining_lengths:
+        if deadline_passed(deadline):
+            logger.warning(f"求解超时，剩余 {len(remaining_lengths)} 根改用 Best-Fit-Decreasing 快速排料")
+            bars.extend(_plan_group_bfd(remaining_lengths, material_length))
+            break
+
+        best_combination = find_best_combination(remaining_lengths, material_length - END_TRIM,
+                                                 CUT_LOSS, MIN_REMAINING, solver, deadline)
+
+        # 如果没有找到有效组合，取第一个剩余长度单独处理
+        if not best_combination:
+            single_length = remaining_lengths.pop(0)
+            logger.warning(f"无法找到最佳组合，单独处理长度: {single_length}")
+            bars.append([single_length])
+            continue
+
+        remaining_lengths = _remove_lengths(remaining_lengths, best_combination)
+        bars.append(best_combination)
+
+    return bars
+
+
+def _plan_group_greedy_subset_sum(lengths, material_length, deadline=None, resolution=SUBSET_SUM_RESOLUTION):
+    """逐根棒料取最大填充，子集和表只建一次，每根棒料后扣掉用掉的长度"""
+    logger = setup_logger()
+    state = _SubsetSumState(lengths, _grid_capacity(material_length - END_TRIM, resolution), CUT_LOSS, resolution)
+    bars = []
+
+    while state.remaining:
+        if deadline_passed(deadline):
+            remaining_lengths = state.lengths()
+            logger.warning(f"求解超时，剩余 {len(remaining_lengths)} 根改用 Best-Fit-Decreasing 快速排料")
+            bars.extend(_plan_group_bfd(remaining_lengths, material_length))
+            break
+
+        total = state.best_total()
+        combination = state.take(total) if total > 0 else None
+        if combination is None:
+            # 没有可达的占用或取模计数恰好抵消（极少发生）：对剩余长度重新求解一次确认
+            combination = _find_best_combination_subset_sum(state.lengths(), material_length - END_TRIM, CUT_LOSS,
+                                                            resolution=resolution)
+            for length in combination:
+                state.remove(length)
+
+        # 如果没有找到有效组合，取最长的剩余长度单独处理
+        if not combination:
+            single_length = max(state.remaining)
+            state.remove(single_length)
+            logger.warning(f"无法找到最佳组合，单独处理长度: {single_length}")
+            bars.append([single_length])
+            continue
+
+        bars.append(combination)
+
+    return bars
+
+
+# 切割方案定价子问题的网格精度：每英寸 32 格（1/32"）
+PATTERN_RESOLUTION = 32
+
+
+def _price_pattern(values, sizes, limits, capacity, resolution=PATTERN_RESOLUTION):
+    """定价子问题：在容量内选取各长度的根数，使对偶价值之和最大
+
+    长度向上取整、容量向下取整到网格，保证生成的方案在实际长度上可行；
+    有上限的多重背包按二进制拆分成 0/1 物品后用 NumPy 动态规划求解。
+    返回 (最大价值, 每种长度的根数)。
+    """
+    grid_capacity = int(np.floor(capacity * resolution + 1e-9))
+    best_value = np.zeros(grid_capacity + 1)
+    chunks = []
+
+    for i, (value, size, limit) in enumerate(zip(values, sizes, limits)):
+        weight = int(np.ceil(size * resolution - 1e-9))
+        limit = min(limit, grid_capacity // weight) if weight else 0
+        if value <= 0 or limit <= 0:
+            continue
+        multiple = 1
+        while limit > 0:
+            count = min(multiple, limit)
+            limit -= count
+            multiple *= 2
+            chunk_weight = count * weight
+            candidate = best_value[:grid_capacity + 1 - chunk_weight] + count * value
+            take = np.zeros(grid_capacity + 1, dtype=bool)
+            take[chunk_weight:] = candidate > best_value[chunk_weight:] + 1e-12
+            best_value[take] = candidate[take[chunk_weight:]]
+            chunks.append((i, count, chunk_weight, take))
+
+    counts = [0] * len(values)
+    position = grid_capacity
+    for i, count, chunk_weight, take in reversed(chunks):
+        if take[position]:
+            counts[i] += count
+            position -= chunk_weight
+    return float(best_value[grid_capacity]), counts
+
+
+# 线性松弛目标超过下界的比例，超过时视为未收敛
+PATTERN_LP_MAX_GAP = 0.1
+# 每隔多少次迭代估计一次目标的下降速度
+PATTERN_STALL_WINDOW = 200
+# 取整后剩余长度的逐根求解器：与 backtrack 结果相同，但不随剩余长度数指数增长
+PATTERN_RESIDUAL_SOLVER = 'subset_sum'
+
+
+def _solve_pattern_lp(sizes, demands, capacity, max_iterations=None, deadline=None):
+    """用列生成求解切割方案的线性松弛
+
+    主问题：min sum(x_p)，s.t. sum(a_p * x_p) >= demands，x_p >= 0。
+    初始基为每种长度单独排满一根的方案，用修正单纯形迭代；
+    已有列（含剩余变量列）都没有负检验数时，才由定价子问题生成新方案。
+    每次定价后用 Farley 下界（目标值 / 最大定价价值）更新线性松弛下界，
+    向上取整后与当前目标值相同时提前结束，避免列生成的长尾迭代；
+    到达 deadline 或 max_iterations 时停止，使用当前基的分数解；长度种类很多时退化迭代下降很慢，
+    每 PATTERN_STALL_WINDOW 次迭代按最近的下降速度估算，迭代上限内到不了下界附近就提前停止。
+    返回 (方案列表, 每个方案的分数根数, 线性松弛下界, 是否收敛)。
+    """
+    m = len(sizes)
+    if max_iterations is None:
+        max_iterations = 1000 + 10 * m
+    demands = np.asarray(demands, dtype=float)
+    limits = demands.astype(int).tolist()
+
+    # 前 m 列为单一长度方案（成本 1），后 m 列为剩余变量 -e_i（成本 0）
+    homogeneous = np.diag([min(demand, capacity // size) for demand, size in zip(demands, sizes)])
+    columns = np.hstack([homogeneous, -np.eye(m)])
+    costs = np.concatenate([np.ones(m), np.zeros(m)])
+    basis = list(range(m))
+    basis_inverse = np.linalg.inv(columns[:, basis])
+    lower_bound = float(np.dot(sizes, demands)) / capacity
+    converged = False
+    window_objective = None
+
+    for iteration in range(1, max_iterations + 1):
+        if deadline_passed(deadline):
+            break
+        basic_values = basis_inverse @ demands
+        duals = costs[basis] @ basis_inverse
+        objective = float(costs[basis] @ basic_values)
+
+        if window_objective is None:
+            window_objective = objective
+        elif iteration % PATTERN_STALL_WINDOW == 0:
+            excess = objective - (lower_bound * (1 + PATTERN_LP_MAX_GAP) + 1)
+            if excess > 0 and (window_objective - objective) * (max_iterations - iteration) < excess * PATTERN_STALL_WINDOW:
+                break
+            window_objective = objective
+
+        reduced_costs = costs - duals @ columns
+        entering = int(np.argmin(reduced_costs))
+        if reduced_costs[entering] >= -1e-9:
+            value, counts = _price_pattern(duals.tolist(), sizes, limits, capacity)
+            lower_bound = max(lower_bound, objective / max(value, 1.0))
+            if value <= 1 + 1e-9 or np.ceil(lower_bound - 1e-6) >= np.ceil(objective - 1e-6):
+                converged = True
+                break
+            columns = np.column_stack([columns, counts])
+            costs = np.append(costs, 1.0)
+            entering = len(costs) - 1
+
+        direction = basis_inverse @ columns[:, entering]
+        candidates = np.flatnonzero(direction > 1e-9)
+        if not candidates.size:
+            break
+        leaving = candidates[np.argmin(basic_values[candidates] / direction[candidates])]
+        basis[leaving] = entering
+
+        # 基逆矩阵做秩一更新，定期重新求逆以控制数值误差
+        if iteration % 50 == 0:
+            basis_inverse = np.linalg.inv(columns[:, basis])
+        else:
+            pivot_row = basis_inverse[leaving] / direction[leaving]
+            basis_inverse -= np.outer(direction, pivot_row)
+            basis_inverse[leaving] = pivot_row
+
+    basic_values = np.maximum(np.linalg.solve(columns[:, basis], demands), 0)
+    patterns = []
+    amounts = []
+    for j, amount in zip(basis, basic_values):
+        # 只保留切割方案列，剩余变量列不对应实际棒料
+        if costs[j] > 0 and amount > 1e-9:
+            patterns.append(columns[:, j].round().astype(int))
+            amounts.append(amount)
+    return patterns, amounts, lower_bound, converged
+
+
+def _plan_group_patterns(lengths, material_length, solver='backtrack', deadline=None):
+    """整组排料：生成切割方案并求线性松弛，再取整为整数方案
+
+    先按线性松弛的分数解向下取整直接得到大部分棒料，
+    剩余长度再交给逐根求解（固定用 PATTERN_RESIDUAL_SOLVER，不使用传入的 solver），返回每根棒料上的长度列表。
+    线性松弛未收敛（达到迭代上限，或目标远高于 L2 下界）时基里多是单件方案，
+    只保留多件方案取整，剩余长度改用 Best-Fit-Decreasing；超时则整组改用 Best-Fit-Decreasing。
+    结果不会比整组 Best-Fit-Decreasing 用料更多。
+    """
+    logger = setup_logger()
+    capacity = material_length - END_TRIM
+    bars = []
+
+    demand = Counter()
+    for length in lengths:
+        if length + CUT_LOSS > capacity:
+            # 超过棒料可用长度的单独处理，与逐根求解保持一致
+            logger.warning(f"无法找到最佳组合，单独处理长度: {length}")
+            bars.append([length])
+        else:
+            demand[length] += 1
+
+    if not demand:
+        return bars
+
+    distinct_lengths = sorted(demand, reverse=True)
+    sizes = [length + CUT_LOSS for length in distinct_lengths]
+    demands = [demand[length] for length in distinct_lengths]
+
+    patterns, amounts, lp_bound, converged = _solve_pattern_lp(sizes, demands, capacity, deadline=deadline)
+    lower_bound = int(np.ceil(lp_bound - 1e-6))
+    bfd_bars = _plan_group_bfd(lengths, material_length)
+
+    # 超时时的基通常还是初始的单一长度方案，取整后每种长度各用一根棒料，不如直接用 Best-Fit-Decreasing
+    if deadline_passed(deadline):
+        logger.warning(f"求解超时，整组 {len(lengths)} 根改用 Best-Fit-Decreasing 快速排料")
+        return bfd_bars
+
+    objective = sum(amounts)
+    l2_bound = group_lower_bound_l2(lengths, material_length)
+    if not converged or objective > l2_bound * (1 + PATTERN_LP_MAX_GAP) + 1:
+        logger.warning(f"切割方案线性松弛未收敛（目标 {objective:.1f} 根，L2 下界 {l2_bound} 根），"
+                       f"只保留多件方案，剩余长度改用 Best-Fit-Decreasing")
+        kept = [(pattern, amount) for pattern, amount in zip(patterns, amounts) if pattern.sum() > 1]
+        patterns = [pattern for pattern, _ in kept]
+        amounts = [amount for _, amount in kept]
+        complete_residual = _plan_group_bfd
+    else:
+        complete_residual = _plan_group_greedy
+
+    # 分数解向下取整，且不超过尚未满足的需求
+    residual = np.array(demands)
+    for pattern, amount in zip(patterns, amounts):
+        for _ in range(int(np.floor(amount + 1e-9))):
+            pattern = np.minimum(pattern, residual)
+            if not pattern.any():
+                break
+            residual -= pattern
+            bars.append([length for length, count in zip(distinct_lengths, pattern) for _ in range(count)])
+
+    residual_lengths = [length for length, count in zip(distinct_lengths, residual) for _ in range(count)]
+    bars.extend(complete_residual(residual_lengths, material_length, PATTERN_RESIDUAL_SOLVER, deadline))
+
+    logger.info(f"切割方案线性松弛下界: {lower_bound} 根，整数方案: {len(bars)} 根，"
+                f"Best-Fit-Decreasing: {len(bfd_bars)} 根")
+    # 棒料根数相同时余料总长也相同
+    return bfd_bars if len(bfd_bars) < len(bars) else bars
+
+
+def _plan_group_bfd(lengths, material_length, solver=None, deadline=None):
+    """Best-Fit-Decreasing 快速排料，适合几百上千根的大材料组
+
+    打开的棒料按剩余长度保存在有序列表中，每根长度用二分查找
+    能放下它的剩余最小的棒料，放入后按新的剩余长度重新插入。
+    solver 和 deadline 不使用，仅为与其他排料方式保持相同接口。
+    """
+    capacity = material_length - END_TRIM
+    bars = []
+    # (剩余可用长度, 棒料下标)，按剩余长度升序
+    open_bars = []
+
+    for length in sorted(lengths, reverse=True):
+        size = length + CUT_LOSS
+        if size > capacity:
+            setup_logger().warning(f"无法找到最佳组合，单独处理长度: {length}")
+            bars.append([length])
+            continue
+
+        position = bisect_left(open_bars, (size, -1))
+        if position < len(open_bars):
+            room, bar_index = open_bars.pop(position)
+        else:
+            room, bar_index = capacity, len(bars)
+            bars.append([])
+
+        bars[bar_index].append(length)
+        insort(open_bars, (room - size, bar_index))
+
+    return bars
+
+
+ENGINES = {
+    'greedy': _plan_group_greedy,
+    'pattern': _plan_group_patterns,
+    'bfd': _plan_group_bfd,
+}
+
+
+def _plan_group_multi_stock(lengths, stock_options, deadline=None, qty=1, resolution=SUBSET_SUM_RESOLUTION):
+    """材料有多种标准长度时逐根选料，使总材料成本尽量低
+
+    整组共用一张子集和表（按最长的标准长度），每根棒料后扣掉用掉的长度，
+    各标准长度的最佳填充直接从表中按容量查出，不需要每种长度重新求解；
+    选单位填充长度成本最低的标准长度，并扣减其库存。
+    数量为 qty 的组叠料切割，每根排出的棒料实际用 qty 根，库存不足 qty 根的标准长度不可选。
+    库存全部用完，或有库存的标准长度都放不下剩下最长的一件时，仍使用最长的标准长度并记录警告，
+    不会把长度排到比它短的标准长度上。
+    返回 (每根棒料上的长度列表, 每根棒料的标准长度)。
+    """
+    logger = setup_logger()
+    inventory = {option['length']: option['inventory'] for option in stock_options}
+    overall_longest = max(option['length'] for option in stock_options)
+    capacity = _grid_capacity(overall_longest - END_TRIM, resolution)
+    state = _SubsetSumState(lengths, capacity, CUT_LOSS, resolution)
+    bars = []
+    bar_stock_lengths = []
+
+    while state.remaining:
+        available = [option for option in stock_options
+                     if inventory[option['length']] is None or inventory[option['length']] >= qty]
+        if not available:
+            available = [max(stock_options, key=lambda option: option['length'])]
+            logger.warning(f"所有标准长度库存已用完，继续使用最长的 {available[0]['length']}")
+        longest = max(option['length'] for option in available)
+        longest_piece = max(state.remaining)
+        fits_available = bar_remaining([longest_piece], longest) >= 0
+        if not fits_available:
+            # 放得下最长一件的标准长度库存已用完，这一件只能用最长的标准长度
+            longest = overall_longest
+
+        if deadline_passed(deadline):
+            remaining_lengths = state.lengths()
+            logger.warning(f"求解超时，剩余 {len(remaining_lengths)} 根改用 Best-Fit-Decreasing 快速排料")
+            fallback_bars = _plan_group_bfd(remaining_lengths, longest)
+            bars.extend(fallback_bars)
+            bar_stock_lengths.extend([longest] * len(fallback_bars))
+            break
+
+        best_at = state.best_at()
+
+        choice = None
+        for option in available:
+            fill = int(best_at[min(_grid_capacity(option['length'] - END_TRIM, resolution), capacity)])
+            if fill > 0 and (choice is None or option['cost'] / fill < choice[0]):
+                choice = (option['cost'] / fill, option['length'], fill)
+
+        if choice is None and not fits_available:
+            logger.warning(f"有库存的标准长度都放不下长度 {longest_piece}，继续使用最长的 {overall_longest}")
+        stock_length = choice[1] if choice is not None else longest
+        combination = state.take(choice[2]) if choice is not None else None
+        if combination is None:
+            # 没有可达的占用或取模计数恰好抵消（极少发生）：按该标准长度对剩余长度重新求解一次确认
+            combination = _find_best_combination_subset_sum(state.lengths(), stock_length - END_TRIM, CUT_LOSS,
+                                                            resolution=resolution)
+            for length in combination:
+                state.remove(length)
+
+        if not combination:
+            single_length = max(state.remaining)
+            state.remove(single_length)
+            logger.warning(f"无法找到最佳组合，单独处理长度: {single_length}")
+            bars.append([single_length])
+            bar_stock_lengths.append(longest)
+            continue
+
+        bars.append(combination)
+        bar_stock_lengths.append(stock_length)
+        if inventory[stock_length] is not None:
+            inventory[stock_length] -= qty
+
+    return bars, bar_stock_lengths
+
+
+def _fill_from_remnants(remnant_store, material, lengths, solver='backtrack'):
+    """先用余料库存中的料头切长度，返回 (余料棒料列表, 剩下的长度)
+
+    从最长的长度开始，用 best_fit 取能放下它的最短余料，再在该余料上求最佳组合；
+    比它更长的长度已确认没有余料放得下，所以组合只会用到它和更短的长度。
+    余料棒料为 (余料 id, 余料长度, 长度列表)，用到的余料从库存中取走。
+    """
+    remaining_lengths = sorted(lengths, reverse=True)
+    remnant_bars = []
+    index = 0
+    while index < len(remaining_lengths):
+        remnant = remnant_store.best_fit(material, remaining_lengths[index] + CUT_LOSS + END_TRIM)
+        if remnant is None:
+            index += 1
+            continue
+        remnant_id, remnant_length = remnant
+        combination = find_best_combination(remaining_lengths[index:], remnant_length - END_TRIM,
+                                            CUT_LOSS, MIN_REMAINING, solver)
+        remnant_store.take(remnant_id)
+        remaining_lengths = remaining_lengths[:index] + _remove_lengths(remaining_lengths[index:], combination)
+        remnant_bars.append((remnant_id, remnant_length, combination))
+    return remnant_bars, remaining_lengths
+
+
+def _material_cost(bar_stock_lengths, stock_options, qty):
+    """叠料切割的每根棒料实际用 qty 根，成本按实际用料计算"""
+    costs = {option['length']: option['cost'] for option in stock_options}
+    return qty * sum(costs[stock_length] for stock_length in bar_stock_lengths)
+
+
+def _plan_group(material, qty, lengths, material_length, engine='greedy', solver='backtrack',
+                compare_engine=None, request_deadline=None, group_time_budget=None, stock_options=None):
+    """为一个 (Material, Qty) 组排料，返回 (每根棒料上的长度列表, 该组统计)
+
+    stock_options 有多种标准长度时改为逐根选料（见 _plan_group_multi_stock），
+    每根棒料的标准长度记录在统计的 bar_stock_lengths 中，material_cost 按实际用料（每根 qty 根）计算。
+    只依赖传入的参数，可以在子进程中独立运行。
+    """
+    logger = setup_logger()
+    logger.info(f"处理材料 {material}，数量 {qty}，标准长度：{material_length}")
+    start = time.perf_counter()
+
+    deadline = request_deadline
+    if group_time_budget is not None:
+        group_deadline = time.monotonic() + group_time_budget
+        deadline = group_deadline if deadline is None else min(deadline, group_deadline)
+
+    if stock_options and len(stock_options) > 1:
+        bars, bar_stock_lengths = _plan_group_multi_stock(lengths, stock_options, deadline, qty)
+        engine = 'multi_stock'
+    else:
+        bars = ENGINES[engine](lengths, material_length, solver, deadline)
+        bar_stock_lengths = [material_length] * len(bars)
+    deadline_hit = deadline_passed(deadline)
+    lower_bound = group_lower_bound_l2(lengths, material_length)
+    stock_total = sum(bar_stock_lengths)
+    stats = {
+        'material': material,
+        'qty': qty,
+        'pieces': len(lengths),
+        'stock_length': material_length,
+        'engine': engine,
+        'bars': len(bars),
+        'waste': sum(bar_remaining(bar, stock_length) for bar, stock_length in zip(bars, bar_stock_lengths)),
+        'lower_bound_l1': group_lower_bound(lengths, material_length),
+        'lower_bound': lower_bound,
+        'gap': len(bars) - lower_bound,
+        'utilization': round(100 * sum(lengths) / stock_total, 2) if stock_total else 0.0,
+        'deadline_hit': deadline_hit,
+        'solve_time': time.perf_counter() - start,
+    }
+    if stock_options and len(stock_options) > 1:
+        stats['bar_stock_lengths'] = bar_stock_lengths
+        stats['material_cost'] = _material_cost(bar_stock_lengths, stock_options, qty)
+    if deadline_hit:
+        logger.warning(f"材料 {material}，数量 {qty} 求解超时，用料 {len(bars)} 根，下界 {lower_bound} 根")
+    if compare_engine and engine != 'multi_stock':
+        compare_bars = ENGINES[compare_engine](lengths, material_length, solver, deadline)
+        stats['compare_engine'] = compare_engine
+        stats['compare_bars'] = len(compare_bars)
+        stats['compare_waste'] = sum(bar_remaining(bar, material_length) for bar in compare_bars)
+        logger.info(f"材料 {material}，数量 {qty}：{engine} 用料 {stats['bars']} 根，余料 {stats['waste']:.2f}；"
+                    f"{compare_engine} 用料 {stats['compare_bars']} 根，余料 {stats['compare_waste']:.2f}")
+    return bars, stats
+
+
+class PlanCache:
+    """材料组排料方案缓存：内存 LRU 层 + 可选的磁盘层
+
+    键为长度多重集、标准长度和求解参数的规范哈希，值为每根棒料上的长度列表和该组统计。
+    磁盘层每个方案一个 JSON 文件，总大小超过 max_disk_bytes 时按最近使用时间淘汰。
+    磁盘层总大小在内存中累计，只有超过上限时才扫描目录并淘汰到上限的 DISK_EVICT_RATIO 以下，
+    留出余量，避免缓存满后每次写入都扫描（多个进程共用目录时各自只累计自己写入的部分，扫描时按实际大小校正）；
+    扫描时顺带删除崩溃遗留、超过 STALE_TEMP_SECONDS 的临时文件。
+    """
+
+    DISK_EVICT_RATIO = 0.9
+
+    # 临时文件超过该时间（秒）仍未改名，视为写入进程已崩溃
+    STALE_TEMP_SECONDS = 3600
+
+    def __init__(self, max_entries=256, directory=None, max_disk_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = self._scan_disk()
+
+    @staticmethod
+    def make_key(lengths, material_length, **params):
+        """长度排序后与切割参数、求解参数一起做 SHA-256"""
+        payload = {
+            'lengths': sorted(to_fixed_point(lengths).tolist(), reverse=True),
+            'material_length': material_length,
+            'cut_loss': CUT_LOSS,
+            'end_trim': END_TRIM,
+            'min_remaining': MIN_REMAINING,
+            'params': params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """返回 (bars, stats) 的副本，未命中返回 None"""
+        with self._lock:
+            plan = self._memory.get(key)
+            if plan is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return [list(bar) for bar in plan[0]], dict(plan[1])
+
+        plan = self._read_disk(key)
+        with self._lock:
+            if plan is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, plan)
+        return [list(bar) for bar in plan[0]], dict(plan[1])
+
+    def put(self, key, bars, stats):
+        plan = ([list(bar) for bar in bars], dict(stats))
+        with self._lock:
+            self._remember(key, plan)
+        self._write_disk(key, plan)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _remember(self, key, plan):
+        self._memory[key] = plan
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'r') as f:
+                data = json.load(f)
+            # 更新访问时间，淘汰时按最近使用排序
+            os.utime(self._path(key))
+            return data['bars'], data['stats']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, plan):
+        if not self.directory:
+            return
+        try:
+            data = json.dumps({'bars': plan[0], 'stats': plan[1]}).encode('utf-8')
+            try:
+                replaced = os.path.getsize(self._path(key))
+            except OSError:
+                replaced = 0
+            temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+            with self._lock:
+                self._disk_bytes += len(data) - replaced
+                over_limit = self._disk_bytes > self.max_disk_bytes
+            if over_limit:
+                total = self._scan_disk(evict=True)
+                with self._lock:
+                    self._disk_bytes = total
+        except OSError as e:
+            setup_logger().warning(f"写入方案缓存失败: {e}")
+
+    def _scan_disk(self, evict=False):
+        """扫描磁盘层，删除过期的临时文件；evict 时按最近使用时间淘汰到 max_disk_bytes * DISK_EVICT_RATIO 以内，
+        返回剩余总大小"""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if name.endswith('.tmp'):
+                    if now - stat.st_mtime > self.STALE_TEMP_SECONDS:
+                        os.remove(path)
+                elif name.endswith('.json'):
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                # 其他进程可能同时改名或淘汰了这个文件
+                continue
+        total = sum(size for _, size, _ in entries)
+        if evict:
+            for _, size, path in sorted(entries):
+                if total <= self.max_disk_bytes * self.DISK_EVICT_RATIO:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+        return total
+
+
+# 默认方案缓存，设置 CUTTING_PLAN_CACHE_DIR 时启用磁盘层
+default_plan_cache = PlanCache(directory=os.environ.get('CUTTING_PLAN_CACHE_DIR') or None)
+
+
+def to_fixed_point(lengths):
+    """英寸长度转为 int64 定点长度（单位 1/LENGTH_SCALE"）"""
+    return np.rint(np.asarray(lengths, dtype=np.float64) * LENGTH_SCALE).astype(np.int64)
+
+
+def from_fixed_point(lengths):
+    """int64 定点长度转回英寸长度列表"""
+    return (np.asarray(lengths, dtype=np.int64) / LENGTH_SCALE).tolist()
+
+
+# 排料用的列式数据：material / qty 为 materials / qtys 中的下标（int32），
+# length 为 int64 定点长度，exact_length 为原始的 float64 长度，
+# position 为 DataFrame 中的原始行位置（int32），均已按切割顺序排好
+PieceColumns = namedtuple('PieceColumns', ['materials', 'qtys', 'material', 'qty', 'length', 'exact_length',
+                                           'position'])
+
+
+def _sort_codes(values):
+    """按值排序的分类编码，缺失值编码在最后（与 sort_values 把缺失值排在最后一致）"""
+    codes, uniques = pd.factorize(values, sort=True)
+    codes = codes.astype(np.int32)
+    codes[codes < 0] = len(uniques)
+    return codes, uniques
+
+
+def _piece_columns(df):
+    """只取排料需要的列转成 PieceColumns，不复制整个 DataFrame
+
+    排序与按材料、数量、长度（降序）、订单号、格号排序相同（按原始长度排序，相差不到定点精度的长度也保持原来的先后），
+    每件约占 28 字节。
+    """
+    material, materials = _sort_codes(df['Material Name'])
+    qty, qtys = _sort_codes(df['Qty'])
+    exact_length = df['Length'].to_numpy(dtype=np.float64)
+    order_no, _ = _sort_codes(df['Order No'])
+    bin_no, _ = _sort_codes(df['Bin No'])
+    order = np.lexsort((bin_no, order_no, -exact_length, qty, material))
+    exact_length = exact_length[order]
+    return PieceColumns(materials, qtys, material[order], qty[order], to_fixed_point(exact_length), exact_length,
+                        order.astype(np.int32))
+
+
+def _select_pieces(columns, mask):
+    """按布尔掩码取出部分行，保持切割顺序"""
+    return columns._replace(material=columns.material[mask], qty=columns.qty[mask],
+                            length=columns.length[mask], exact_length=columns.exact_length[mask],
+                            position=columns.position[mask])
+
+
+def _bucket_lengths(lengths, tolerance):
+    """合并相近的定点长度，返回每行排料用的标准长度（定点）
+
+    从最长的长度开始，不短于 桶首长度 - tolerance 的长度归入同一桶，标准长度取桶内最长的长度，
+    按标准长度排出的棒料对桶内每一件的真实长度都可行。tolerance 为 0 时原样返回。
+    """
+    if tolerance <= 0 or len(lengths) == 0:
+        return lengths
+    distinct = np.unique(lengths)[::-1]
+    heads = []
+    head = None
+    for value in distinct.tolist():
+        if head is None or value < head - tolerance:
+            head = value
+        heads.append(head)
+    return np.asarray(heads, dtype=np.int64)[np.searchsorted(-distinct, -lengths)]
+
+
+def _column_groups(columns):
+    """依次产出每个 (材料, 数量) 组的 (材料, 数量, 切片)；材料或数量缺失的行不排料"""
+    if len(columns.length) == 0:
+        return
+    change = np.flatnonzero((np.diff(columns.material) != 0) | (np.diff(columns.qty) != 0)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(columns.length)]))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        material_code = columns.material[start]
+        qty_code = columns.qty[start]
+        if material_code < len(columns.materials) and qty_code < len(columns.qtys):
+            yield columns.materials[material_code], columns.qtys[qty_code], slice(start, end)
+
+
+def _assign_bars(material, bars, row_lengths, row_positions, cutting_ids, material_length):
+    """把每根棒料上的长度分配到具体行
+
+    row_lengths（定点长度）/ row_positions 为该组按切割顺序排好的行，cutting_ids 依次提供每根棒料的 Cutting ID。
+    每组只建一次索引：定点长度 -> 尚未分配的行（保持排序后的先后顺序），按整数精确匹配。
+    返回 (行位置, Cutting ID, Pieces ID) 三个列表。
+    """
+    logger = setup_logger()
+    unassigned_rows = defaultdict(deque)
+    for position, length in zip(np.asarray(row_positions).tolist(), np.asarray(row_lengths).tolist()):
+        unassigned_rows[length].append(position)
+
+    positions = []
+    assigned_cutting_ids = []
+    pieces_ids = []
+    for bar, cutting_id in zip(bars, cutting_ids):
+        logger.debug(f"切割 ID {cutting_id} 的组合: {bar}，剩余长度: {bar_remaining(bar, material_length)}")
+
+        for pieces_id, length in enumerate(bar, 1):
+            rows = unassigned_rows.get(round(length * LENGTH_SCALE))
+
+            if rows:
+                positions.append(rows.popleft())
+                assigned_cutting_ids.append(cutting_id)
+                pieces_ids.append(pieces_id)
+                logger.debug(f"添加切割信息: 材料={material}, 长度={length}, 切割ID={cutting_id}, 件数ID={pieces_id}")
+            else:
+                logger.warning(f"未找到长度为 {length} 的未处理行，跳过")
+
+    return positions, assigned_cutting_ids, pieces_ids
+
+
+def _plan_groups(plan_args, indices, plans, workers=None, plan_cache=None, remaining_inventory=None):
+    """为 indices 中的组排料，结果 (bars, stats) 写入 plans[i]
+
+    plan_cache 不为空时先查缓存，新排出且未超时的方案写回缓存；
+    workers 大于 1 时各组在进程池中并行排料（大组优先提交）；
+    remaining_inventory 不为 None 表示标准长度有库存限制：按顺序串行排料，
+    每组用前面各组剩下的库存，并扣减本组用掉的棒料（叠料切割的每根棒料用 qty 根）。
+    库存按设置中的材料键和标准长度计，同一型材的不同颜色共用一份库存（见 get_material_stock_options）。
+    """
+    logger = setup_logger()
+    cache_keys = {}
+    if plan_cache is not None:
+        for i in indices:
+            material, qty, lengths, material_length, engine, solver, compare_engine, *_, stock_options = plan_args[i]
+            cache_keys[i] = plan_cache.make_key(lengths, material_length, engine=engine, solver=solver,
+                                                compare_engine=compare_engine, stock_options=stock_options)
+            cached = plan_cache.get(cache_keys[i])
+            if cached is not None:
+                bars, stats = cached
+                logger.info(f"材料 {material}，数量 {qty} 命中方案缓存")
+                stats = dict(stats, material=material, qty=qty, solve_time=0.0)
+                # 缓存键不含数量，成本按本组数量重新计算
+                if 'bar_stock_lengths' in stats:
+                    stats['material_cost'] = _material_cost(stats['bar_stock_lengths'], stock_options, qty)
+                plans[i] = bars, stats
+    pending = [i for i in indices if plans[i] is None]
+
+    # 各组之间互不依赖，先全部排料，再按原顺序分配 Cutting ID
+    if workers and workers > 1 and len(pending) > 1:
+        largest_first = sorted(pending, key=lambda i: len(plan_args[i][2]), reverse=True)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {i: executor.submit(_plan_group, *plan_args[i]) for i in largest_first}
+            for i in pending:
+                plans[i] = futures[i].result()
+    else:
+        for i in pending:
+            material, qty, *args, stock_options = plan_args[i]
+            if remaining_inventory is not None:
+                key = get_material_key(material)
+                stock_options = [dict(option, inventory=remaining_inventory.get((key, option['length']),
+                                                                                option['inventory']))
+                                 for option in stock_options]
+            plans[i] = _plan_group(material, qty, *args, stock_options)
+            if remaining_inventory is not None:
+                used = Counter(plans[i][1].get('bar_stock_lengths', []))
+                for option in stock_options:
+                    if option['inventory'] is not None:
+                        remaining_inventory[(key, option['length'])] = max(
+                            option['inventory'] - used[option['length']] * qty, 0)
+
+    # 超时的方案不是完整求解结果，不写入缓存
+    if plan_cache is not None:
+        for i in pending:
+            bars, stats = plans[i]
+            if not stats['deadline_hit']:
+                plan_cache.put(cache_keys[i], bars,
+                               {k: v for k, v in stats.items() if k not in ('material', 'qty', 'solve_time')})
+
+
+class _StackTails:
+    """叠料切割后各层剩下的料尾，提供与 RemnantStore 相同的 best_fit / take，只保存在内存中
+
+    tails[tail_id] 为 (组下标, 棒料下标, 长度)，按长度排序的列表用于二分查找。
+    """
+
+    def __init__(self):
+        self.tails = {}
+        self._by_length = []
+
+    def add(self, group_index, bar_index, length):
+        tail_id = len(self.tails)
+        self.tails[tail_id] = (group_index, bar_index, length)
+        insort(self._by_length, (length, tail_id))
+
+    def best_fit(self, material, min_length):
+        index = bisect_left(self._by_length, (min_length, -1))
+        if index == len(self._by_length):
+            return None
+        length, tail_id = self._by_length[index]
+        return tail_id, length
+
+    def take(self, tail_id):
+        length = self.tails[tail_id][2]
+        self._by_length.pop(bisect_left(self._by_length, (length, tail_id)))
+
+    def unused_lengths(self, group_index):
+        return [length for length, tail_id in self._by_length if self.tails[tail_id][0] == group_index]
+
+
+def _plan_column_groups(columns, solver, engine, compare_engine=None, request_deadline=None, group_time_budget=None,
+                        workers=None, plan_cache=None, length_tolerance=None, pool_qty=False, remnant_store=None):
+    """为 columns 中的每个 (材料, 数量) 组排料，参数含义见 process_cutting_data
+
+    返回 (groups, plans, stack_tails)：groups[i] 为
+    (材料, 数量, 切片, 排料用的定点长度, 标准长度, 余料棒料, 料尾棒料)，plans[i] 为 (新棒料, 统计)，
+    stack_tails 为各材料叠料切割剩下的料尾（pool_qty 时）。
+    """
+    logger = setup_logger()
+    groups = []
+    plan_args = []
+    for material, qty, rows in _column_groups(columns):
+        material_length = get_material_length(material)
+        stock_options = get_material_stock_options(material)
+        tolerance = get_material_tolerance(material) if length_tolerance is None else length_tolerance
+        row_lengths = _bucket_lengths(columns.length[rows], int(round(tolerance * LENGTH_SCALE)))
+        # 不合并长度时按原始长度排料，结果与逐行排序排料完全一致；合并时按桶的标准长度排料
+        if tolerance > 0:
+            lengths = from_fixed_point(row_lengths)
+        else:
+            lengths = columns.exact_length[rows].tolist()
+        # 一根余料只能切出一件，数量大于 1 的组叠料切割，不使用余料
+        remnant_bars = []
+        if remnant_store is not None and qty == 1:
+            remnant_bars, lengths = _fill_from_remnants(remnant_store, material, lengths, solver)
+            if remnant_bars:
+                logger.info(f"材料 {material} 使用余料 {len(remnant_bars)} 根")
+        groups.append((material, qty, rows, row_lengths, material_length, remnant_bars, []))
+        plan_args.append((material, qty, lengths, material_length, engine, solver,
+                          compare_engine, request_deadline, group_time_budget, stock_options))
+
+    # 有库存限制时后面的组依赖前面组的用料，只能串行排料且不使用缓存
+    inventory_limited = any(option['inventory'] is not None for args in plan_args for option in args[-1])
+    remaining_inventory = None
+    if inventory_limited:
+        logger.info("标准长度有库存限制，按顺序串行排料")
+        workers = None
+        plan_cache = None
+        remaining_inventory = {}
+
+    stack_tails = defaultdict(_StackTails)
+    plans = [None] * len(groups)
+    if pool_qty:
+        # 先排叠料切割的组，各层料尾再留给同材料数量为 1 的组
+        stacked = [i for i, group in enumerate(groups) if group[1] != 1]
+        _plan_groups(plan_args, stacked, plans, workers, plan_cache, remaining_inventory)
+        for i in stacked:
+            material, qty, _, _, material_length, *_ = groups[i]
+            bars, stats = plans[i]
+            bar_lengths = stats.get('bar_stock_lengths') or [material_length] * len(bars)
+            for bar_index, (bar, stock_length) in enumerate(zip(bars, bar_lengths)):
+                for _ in range(int(qty)):
+                    stack_tails[material].add(i, bar_index, bar_remaining(bar, stock_length) - CUT_LOSS)
+
+        single = [i for i, group in enumerate(groups) if group[1] == 1]
+        for i in single:
+            material = groups[i][0]
+            if material not in stack_tails:
+                continue
+            tail_bars, lengths = _fill_from_remnants(stack_tails[material], material, plan_args[i][2], solver)
+            if tail_bars:
+                logger.info(f"材料 {material} 使用叠料切割的料尾 {len(tail_bars)} 根")
+            groups[i] = groups[i][:6] + (tail_bars,)
+            plan_args[i] = plan_args[i][:2] + (lengths,) + plan_args[i][3:]
+        _plan_groups(plan_args, single, plans, workers, plan_cache, remaining_inventory)
+    else:
+        _plan_groups(plan_args, range(len(groups)), plans, workers, plan_cache, remaining_inventory)
+
+    for (material, qty, rows, row_lengths, *_, tail_bars), (_, stats) in zip(groups, plans):
+        stats['distinct_lengths'] = len(np.unique(columns.length[rows]))
+        stats['length_buckets'] = len(np.unique(row_lengths))
+        if pool_qty and qty == 1:
+            stats['stack_tails_used'] = len(tail_bars)
+    return groups, plans, stack_tails
+
+
+def process_cutting_data(df, solver='backtrack', engine='greedy', compare_engine=None,
+                         time_budget=None, group_time_budget=None, workers=None, plan_cache=None,
+                         remnant_store=None, timings=None, pool_qty=False, length_tolerance=None):
+    """处理切割数据的核心函数
+
+    solver 传给 find_best_combination，用于选择单根棒料的求解器；
+    engine 选择整组排料方式：'greedy' 逐根求解，'pattern' 整组做切割方案生成，
+    'bfd' 为 Best-Fit-Decreasing 快速排料；
+    compare_engine 不为空时每组再用该方式排一次，只记录用料和余料用于对比。
+    time_budget / group_time_budget 为整个请求 / 每个材料组的求解时间上限（秒），
+    超时的组保留已找到的最佳组合，剩余长度改用 Best-Fit-Decreasing 快速排料。
+    workers 大于 1 时各组在进程池中并行排料（大组优先提交），
+    Cutting ID 在全部组完成后按原顺序编号，结果与串行相同。
+    plan_cache 为 PlanCache 时，长度多重集和参数相同的组直接复用已缓存的方案。
+    材料配置了多种标准长度时按成本逐根选料，
+    每根棒料所用的标准长度保存在 result_df.attrs['bar_stock_lengths']。
+    remnant_store 为 RemnantStore 时，数量为 1 的组先用库存余料切（见 _fill_from_remnants），
+    再切新棒料；每根棒料切完后不短于 remnant_store.min_length 的料头入库（数量为 q 的组入库 q 根）。
+    用到的余料记录在 result_df.attrs['remnant_bars']，处理成功才提交余料库存的变更。
+    未配置标准长度、按默认长度排料的材料名称列在 result_df.attrs['default_length_materials']。
+    每组的统计保存在 result_df.attrs['group_stats']，solve_time 为该组排料耗时（秒，命中缓存为 0）。
+    timings 为 Timings 时记录 optimize（排料）和 write_back（分配和写回）两个阶段的耗时。
+    pool_qty 为 True 时同一材料跨数量排料：数量为 q 的长度仍由 q 根叠放的棒料一起切，
+    叠料切完后每层剩下的料尾拆开，先给该材料数量为 1 的长度使用，再切新棒料；
+    用到的料尾记录在 result_df.attrs['stack_tails']（parent_cutting_id 为料尾所在的叠料棒料）。
+    length_tolerance（英寸）内的相近长度按最长的一个排料（见 _bucket_lengths），输出仍为每行的真实长度；
+    为 None 时使用设置中各材料的容差，每组合并前后的长度种数记录在 distinct_lengths / length_buckets。
+    """
+    timings = timings or NULL_TIMINGS
+    request_deadline = time.monotonic() + time_budget if time_budget is not None else None
     logger = setup_logger()
     
     try:
         logger.info("开始处理数据")
+
+        for name in (engine, compare_engine or engine):
+            if name not in ENGINES:
+                raise ValueError(f"未知的排料方式: {name}")
         
         # 检查必要的列是否存在
         required_columns = ['Material Name', 'Qty', 'Length', 'Order No', 'Bin No']
@@ -69,101 +1340,289 @@ def process_cutting_data(df):
         if missing_columns:
             raise ValueError(f"数据中缺少必要的列: {', '.join(missing_columns)}")
         
-        # 创建一个临时DataFrame进行排序和计算
-        temp_df = df.copy()
-        temp_df['original_index'] = temp_df.index
-        temp_df = temp_df.sort_values(['Material Name', 'Qty', 'Length', 'Order No', 'Bin No'], 
-                                      ascending=[True, True, False, True, True])
+        # 未配置标准长度的材料会按默认长度排料，提示出来而不是静默回退
+        _, uses_default = resolve_material_lengths(df['Material Name'])
+        default_materials = sorted(set(df['Material Name'][uses_default].dropna().astype(str)))
+        if default_materials:
+            logger.warning(f"以下材料未配置标准长度，使用默认长度: {', '.join(default_materials)}")
+
+        # 只取排料需要的列，转成按切割顺序排好的定点数组
+        columns = _piece_columns(df)
         
-        cutting_info = defaultdict(list)
+        # 分配结果按行位置收集，最后一次性写回
+        assigned_positions = []
+        assigned_cutting_ids = []
+        assigned_pieces_ids = []
         material_total_lengths = defaultdict(float)
         material_max_cutting_id = defaultdict(int)
-        processed_rows = set()
-
-        for (material, qty), material_group in temp_df.groupby(['Material Name', 'Qty']):
-            material_length = get_material_length(material)
-            logger.info(f"处理材料 {material}，数量 {qty}，标准长度：{material_length}")
-            
-            all_lengths = material_group['Length'].tolist()
-            cutting_id = material_max_cutting_id[material] + 1
-            
-            while all_lengths:
-                best_combination = find_best_combination(all_lengths, material_length - 6, 4, 10)
-                remaining = material_length - sum(best_combination) - (len(best_combination) - 1) * 4 - 6
-                logger.debug(f"切割 ID {cutting_id} 的最佳组合: {best_combination}，剩余长度: {remaining}")
-                
-                # 如果没有找到有效组合，处理剩余的单个长度
-                if not best_combination:
-                    if all_lengths:
-                        # 取第一个剩余长度单独处理
-                        single_length = all_lengths[0]
-                        logger.warning(f"无法找到最佳组合，单独处理长度: {single_length}")
-                        
-                        # 查找对应的行
-                        unprocessed_rows = material_group[
-                            (material_group['Length'] == single_length) & 
-                            (~material_group.index.isin(processed_rows))
-                        ]
-                        
-                        if not unprocessed_rows.empty:
-                            row = unprocessed_rows.iloc[0]
-                            key = (row['Material Name'], row['Qty'], row['Length'], row['Order No'], row['Bin No'])
-                            cutting_info[(material, qty)].append((key, cutting_id, 1, row['original_index']))
-                            
-                            processed_rows.add(row.name)
-                            all_lengths.remove(single_length)
-                            material_total_lengths[(material, qty)] += single_length
-                            
-                            logger.debug(f"添加单独切割信息: 材料={material}, 长度={single_length}, 切割ID={cutting_id}")
-                        else:
-                            # 如果找不到对应行，直接移除以避免无限循环
-                            all_lengths.remove(single_length)
-                            logger.warning(f"未找到长度为 {single_length} 的未处理行，直接移除")
-                    
-                    cutting_id += 1
-                    continue
-                
-                for pieces_id, length in enumerate(best_combination, 1):
-                    unprocessed_rows = material_group[
-                        (material_group['Length'] == length) & 
-                        (~material_group.index.isin(processed_rows))
-                    ]
-                    
-                    if not unprocessed_rows.empty:
-                        row = unprocessed_rows.iloc[0]
-                        key = (row['Material Name'], row['Qty'], row['Length'], row['Order No'], row['Bin No'])
-                        cutting_info[(material, qty)].append((key, cutting_id, pieces_id, row['original_index']))
-                        
-                        processed_rows.add(row.name)
-                        all_lengths.remove(length)
-                        material_total_lengths[(material, qty)] += length
-                        
-                        logger.debug(f"添加切割信息: 材料={material}, 长度={length}, 切割ID={cutting_id}, 件数ID={pieces_id}")
+        group_stats = []
+        bar_stock_lengths = []
+        remnant_bar_records = []
+        stack_tail_records = []
+        group_first_ids = []
+
+        with timings.timer('optimize'):
+            groups, plans, stack_tails = _plan_column_groups(
+                columns, solver, engine, compare_engine, request_deadline, group_time_budget, workers, plan_cache,
+                length_tolerance, pool_qty, remnant_store)
+
+        with timings.timer('write_back'):
+            for (material, qty, rows, row_lengths, material_length, remnant_bars, tail_bars), (bars, stats) \
+                    in zip(groups, plans):
+                cutting_id = material_max_cutting_id[material] + 1
+                group_first_ids.append(cutting_id)
+                group_stats.append(stats)
+
+                # 余料和料尾排在新棒料前面编号
+                reused_bars = remnant_bars + tail_bars
+                all_bars = [bar for _, _, bar in reused_bars] + bars
+                positions, cutting_ids, pieces_ids = _assign_bars(
+                    material, all_bars, row_lengths, columns.position[rows], itertools.count(cutting_id), material_length)
+                assigned_positions.extend(positions)
+                assigned_cutting_ids.extend(cutting_ids)
+                assigned_pieces_ids.extend(pieces_ids)
+                material_total_lengths[(material, qty)] += sum(sum(bar) for bar in all_bars)
+                for bar_cutting_id, (remnant_id, remnant_length, _) in zip(itertools.count(cutting_id), remnant_bars):
+                    remnant_bar_records.append({'material': material, 'cutting_id': bar_cutting_id,
+                                                'remnant_id': remnant_id, 'remnant_length': remnant_length})
+                for bar_cutting_id, stock_length in zip(itertools.count(cutting_id + len(reused_bars)),
+                                                        stats.get('bar_stock_lengths', [])):
+                    bar_stock_lengths.append({'material': material, 'cutting_id': bar_cutting_id,
+                                              'stock_length': stock_length})
+
+                if remnant_store is not None:
+                    # 料头长度为棒料剩余长度再减去切下它的一刀
+                    stats['remnants_used'] = len(remnant_bars)
+                    stats['offcuts_recorded'] = 0
+                    if pool_qty and qty != 1:
+                        # 叠料的料尾已按层拆开，没被用掉的各入库一次
+                        offcuts = stack_tails[material].unused_lengths(len(group_first_ids) - 1)
                     else:
-                        logger.warning(f"未找到长度为 {length} 的未处理行，跳过")
-                
-                cutting_id += 1
-            
-            material_max_cutting_id[material] = cutting_id - 1
-            logger.info(f"材料 {material}，数量 {qty} 处理完成，总长度: {material_total_lengths[(material, qty)]:.2f}")
-
-        logger.info("完成切割信息计算")
-
-        # 创建结果 DataFrame，保持原始顺序
-        result_df = df.copy()
-        result_df['Cutting ID'] = 0
-        result_df['Pieces ID'] = 0
-
-        # 填充 Cutting ID 和 Pieces ID
-        for (material, qty), info_list in cutting_info.items():
-            for (key, cutting_id, pieces_id, original_index) in info_list:
-                result_df.loc[original_index, 'Cutting ID'] = cutting_id
-                result_df.loc[original_index, 'Pieces ID'] = pieces_id
+                        bar_lengths = stats.get('bar_stock_lengths') or [material_length] * len(bars)
+                        offcuts = [bar_remaining(bar, length) - CUT_LOSS for _, length, bar in reused_bars]
+                        offcuts += [bar_remaining(bar, stock_length) - CUT_LOSS
+                                    for bar, stock_length in zip(bars, bar_lengths)] * int(qty)
+                    for offcut in offcuts:
+                        stats['offcuts_recorded'] += remnant_store.add(material, offcut)
+
+                material_max_cutting_id[material] = cutting_id + len(all_bars) - 1
+                logger.info(f"材料 {material}，数量 {qty} 处理完成，总长度: {material_total_lengths[(material, qty)]:.2f}")
+
+            # 料尾所在的叠料棒料在同材料中可能排在后面编号，全部编号后再记录
+            for (material, _, _, _, _, remnant_bars, tail_bars), first_id in zip(groups, group_first_ids):
+                for bar_cutting_id, (tail_id, tail_length, _) in zip(itertools.count(first_id + len(remnant_bars)), tail_bars):
+                    parent_group, parent_bar, _ = stack_tails[material].tails[tail_id]
+                    stack_tail_records.append({'material': material, 'cutting_id': bar_cutting_id,
+                                               'parent_cutting_id': group_first_ids[parent_group] + parent_bar,
+                                               'tail_length': tail_length})
+
+            distinct_lengths = sum(stats['distinct_lengths'] for stats in group_stats)
+            length_buckets = sum(stats['length_buckets'] for stats in group_stats)
+            if length_buckets < distinct_lengths:
+                logger.info(f"合并相近长度：{distinct_lengths} 种长度合并为 {length_buckets} 种")
+
+            logger.info("完成切割信息计算")
+
+            # 创建结果 DataFrame，保持原始顺序
+            result_df = df.copy()
+
+            # 按行位置批量填充 Cutting ID 和 Pieces ID
+            positions = np.asarray(assigned_positions, dtype=np.int64)
+            cutting_ids = np.zeros(len(result_df), dtype=np.int64)
+            pieces_ids = np.zeros(len(result_df), dtype=np.int64)
+            cutting_ids[positions] = assigned_cutting_ids
+            pieces_ids[positions] = assigned_pieces_ids
+            result_df['Cutting ID'] = cutting_ids
+            result_df['Pieces ID'] = pieces_ids
 
         logger.info("完成 Cutting ID 和 Pieces ID 填充")
+        result_df.attrs['group_stats'] = group_stats
+        result_df.attrs['bar_stock_lengths'] = bar_stock_lengths
+        result_df.attrs['remnant_bars'] = remnant_bar_records
+        result_df.attrs['stack_tails'] = stack_tail_records
+        result_df.attrs['default_length_materials'] = default_materials
+        if remnant_store is not None:
+            remnant_store.commit()
         
         return True, "数据处理成功", result_df
     
     except Exception as e:
         logger.error(f"处理数据时出错: {str(e)}", exc_info=True)
-        return False, f"处理数据时出错: {str(e)}", None
\ No newline at end of file
+        if remnant_store is not None:
+            remnant_store.rollback()
+        return False, f"处理数据时出错: {str(e)}", None
+
+
+def aggregate_patterns(result_df):
+    """把切割方案相同的棒料合并为一行，返回方案表
+
+    每根棒料（材料 + Cutting ID）上的长度降序排列后作为方案，
+    材料、数量、标准长度和方案都相同的棒料合并，锯床可以按 Repeat 次数连续切割不用重新设置。
+    列：Material Name, Qty, Stock Length, Pattern, Pieces, Repeat, Cutting IDs, Rows（result_df 中的行位置，从 0 开始）。
+    Pattern 中的长度保留 6 位小数，与 LENGTH_SCALE 的精度一致，不同长度不会显示成同一个值。
+    """
+    stock_lengths = {}
+    for record in result_df.attrs.get('bar_stock_lengths', []):
+        stock_lengths[(record['material'], record['cutting_id'])] = record['stock_length']
+    for record in result_df.attrs.get('remnant_bars', []):
+        stock_lengths[(record['material'], record['cutting_id'])] = record['remnant_length']
+    for record in result_df.attrs.get('stack_tails', []):
+        stock_lengths[(record['material'], record['cutting_id'])] = record['tail_length']
+
+    # 行标签可能不是 0..n-1（如增量处理后），统一换成行位置
+    is_cut = (result_df['Cutting ID'] > 0).to_numpy()
+    cut_df = result_df[is_cut]
+    bars = defaultdict(list)
+    bar_qty = {}
+    for row, material, qty, cutting_id, length in zip(np.flatnonzero(is_cut).tolist(), cut_df['Material Name'],
+                                                      cut_df['Qty'], cut_df['Cutting ID'], cut_df['Length']):
+        bars[(material, cutting_id)].append((length, row))
+        bar_qty[(material, cutting_id)] = qty
+
+    material_lengths = {}
+    patterns = OrderedDict()
+    for (material, cutting_id) in sorted(bars):
+        if material not in material_lengths:
+            material_lengths[material] = get_material_length(material)
+        stock_length = stock_lengths.get((material, cutting_id), material_lengths[material])
+        pieces = sorted(bars[(material, cutting_id)], key=lambda piece: piece[0], reverse=True)
+        key = (material, bar_qty[(material, cutting_id)], stock_length, tuple(length for length, _ in pieces))
+        pattern = patterns.setdefault(key, {'cutting_ids': [], 'rows': []})
+        pattern['cutting_ids'].append(int(cutting_id))
+        pattern['rows'].extend(row for _, row in pieces)
+
+    return pd.DataFrame(
+        [{
+            'Material Name': material,
+            'Qty': qty,
+            'Stock Length': stock_length,
+            'Pattern': ' + '.join(f"{length:.6f}" for length in lengths),
+            'Pieces': len(lengths),
+            'Repeat': len(pattern['cutting_ids']),
+            'Cutting IDs': pattern['cutting_ids'],
+            'Rows': pattern['rows'],
+        } for (material, qty, stock_length, lengths), pattern in patterns.items()],
+        columns=['Material Name', 'Qty', 'Stock Length', 'Pattern', 'Pieces', 'Repeat', 'Cutting IDs', 'Rows'])
+
+
+def reoptimize_cutting_data(previous_df, added_df=None, removed_rows=None, solver='backtrack', engine='greedy',
+                            compare_engine=None, time_budget=None, group_time_budget=None, workers=None,
+                            plan_cache=None, pool_qty=False, length_tolerance=None):
+    """在已排好的结果上增量处理新增和取消的行
+
+    previous_df 为 process_cutting_data 的结果，added_df 为新增的行，
+    removed_rows 为要取消的 previous_df 行标签。
+    只重新排受影响的 (Material, Qty) 组中被取消行所在的棒料，加上该组新增的行；
+    未受影响的棒料保持原来的 Cutting ID 和 Pieces ID。
+    重排后的棒料先复用被拆开棒料的 Cutting ID，不够时从该材料当前最大 ID 往后编号。
+    新增的行追加在结果末尾。
+    排料选项与 process_cutting_data 相同，attrs 中被拆开棒料的记录换成重排后的记录。
+    """
+    request_deadline = time.monotonic() + time_budget if time_budget is not None else None
+    logger = setup_logger()
+
+    try:
+        logger.info("开始增量处理数据")
+
+        for name in (engine, compare_engine or engine):
+            if name not in ENGINES:
+                raise ValueError(f"未知的排料方式: {name}")
+        removed_rows = list(removed_rows) if removed_rows is not None else []
+
+        required_columns = ['Material Name', 'Qty', 'Length', 'Order No', 'Bin No', 'Cutting ID', 'Pieces ID']
+        missing_columns = [col for col in required_columns if col not in previous_df.columns]
+        if missing_columns:
+            raise ValueError(f"原结果中缺少必要的列: {', '.join(missing_columns)}")
+
+        removed_df = previous_df.loc[removed_rows]
+        kept_df = previous_df.drop(index=removed_rows)
+        if added_df is not None and len(added_df):
+            added_df = added_df.copy()
+            added_df['Cutting ID'] = 0
+            added_df['Pieces ID'] = 0
+            start = (max(kept_df.index) + 1) if len(kept_df) else 0
+            added_df.index = range(start, start + len(added_df))
+            result_df = pd.concat([kept_df, added_df])
+        else:
+            added_df = previous_df.iloc[0:0]
+            result_df = kept_df.copy()
+        is_added = result_df.index.isin(added_df.index)
+
+        # 被取消的行所在的棒料；Cutting ID 按材料连续编号，每根棒料只属于一个 (Material, Qty) 组
+        freed_ids = defaultdict(set)
+        for material, qty, cutting_id in zip(removed_df['Material Name'], removed_df['Qty'], removed_df['Cutting ID']):
+            if cutting_id > 0:
+                freed_ids[(material, qty)].add(cutting_id)
+        touched_bars = {(material, cutting_id) for (material, _), ids in freed_ids.items() for cutting_id in ids}
+        # 叠料棒料被拆开后原来的料尾不再存在，用这些料尾切的棒料也要重排
+        for record in previous_df.attrs.get('stack_tails', []):
+            if (record['material'], record['parent_cutting_id']) in touched_bars:
+                freed_ids[(record['material'], 1)].add(record['cutting_id'])
+                touched_bars.add((record['material'], record['cutting_id']))
+
+        # 只保留被拆开棒料上剩下的行和新增的行
+        columns = _piece_columns(result_df)
+        row_materials = result_df['Material Name'].to_numpy()[columns.position]
+        row_cutting_ids = result_df['Cutting ID'].to_numpy()[columns.position]
+        is_touched = np.array([(material, cutting_id) in touched_bars
+                               for material, cutting_id in zip(row_materials, row_cutting_ids)], dtype=bool)
+        columns = _select_pieces(columns, is_touched | is_added[columns.position])
+
+        cutting_ids = result_df['Cutting ID'].to_numpy().copy()
+        pieces_ids = result_df['Pieces ID'].to_numpy().copy()
+        # 取原结果的最大 ID：整根被取消的棒料不在 result_df 中，但它的 ID 可能被别的数量组复用
+        material_max_cutting_id = previous_df.groupby('Material Name')['Cutting ID'].max().to_dict()
+        group_stats = []
+        bar_stock_lengths = []
+        stack_tail_records = []
+        group_bar_ids = []
+
+        groups, plans, stack_tails = _plan_column_groups(
+            columns, solver, engine, compare_engine, request_deadline, group_time_budget, workers, plan_cache,
+            length_tolerance, pool_qty)
+
+        for (material, qty, rows, row_lengths, material_length, _, tail_bars), (bars, stats) in zip(groups, plans):
+            group_stats.append(stats)
+
+            # 料尾排在新棒料前面；先复用被拆开棒料的 ID，再接着该材料当前最大 ID 编号
+            all_bars = [bar for _, _, bar in tail_bars] + bars
+            next_id = material_max_cutting_id.get(material, 0) + 1
+            bar_ids = (sorted(freed_ids[(material, qty)]) + list(range(next_id, next_id + len(all_bars))))[:len(all_bars)]
+            material_max_cutting_id[material] = max(next_id - 1, *bar_ids)
+            group_bar_ids.append(bar_ids)
+
+            positions, assigned_cutting_ids, assigned_pieces_ids = _assign_bars(
+                material, all_bars, row_lengths, columns.position[rows], bar_ids, material_length)
+            cutting_ids[positions] = assigned_cutting_ids
+            pieces_ids[positions] = assigned_pieces_ids
+            for bar_cutting_id, stock_length in zip(bar_ids[len(tail_bars):], stats.get('bar_stock_lengths', [])):
+                bar_stock_lengths.append({'material': material, 'cutting_id': bar_cutting_id,
+                                          'stock_length': stock_length})
+            logger.info(f"材料 {material}，数量 {qty} 增量处理完成，重排 {rows.stop - rows.start} 根长度，用料 {len(all_bars)} 根")
+
+        # 料尾所在的叠料棒料可能在后面的组编号，全部编号后再记录
+        for (material, *_, tail_bars), bar_ids in zip(groups, group_bar_ids):
+            for bar_cutting_id, (tail_id, tail_length, _) in zip(bar_ids, tail_bars):
+                parent_group, parent_bar, _ = stack_tails[material].tails[tail_id]
+                stack_tail_records.append({'material': material, 'cutting_id': bar_cutting_id,
+                                           'parent_cutting_id': group_bar_ids[parent_group][parent_bar],
+                                           'tail_length': tail_length})
+
+        def untouched(records):
+            return [record for record in records if (record['material'], record['cutting_id']) not in touched_bars]
+
+        result_df['Cutting ID'] = cutting_ids
+        result_df['Pieces ID'] = pieces_ids
+        result_df.attrs['group_stats'] = group_stats
+        result_df.attrs['bar_stock_lengths'] = untouched(previous_df.attrs.get('bar_stock_lengths', [])) + bar_stock_lengths
+        result_df.attrs['remnant_bars'] = untouched(previous_df.attrs.get('remnant_bars', []))
+        result_df.attrs['stack_tails'] = untouched(previous_df.attrs.get('stack_tails', [])) + stack_tail_records
+        _, uses_default = resolve_material_lengths(result_df['Material Name'])
+        result_df.attrs['default_length_materials'] = sorted(
+            set(result_df['Material Name'][uses_default].dropna().astype(str)))
+
+        return True, "增量处理成功", result_df
+
+    except Exception as e:
+        logger.error(f"增量处理数据时出错: {str(e)}", exc_info=True)
+        return False, f"增量处理数据时出错: {str(e)}", None
@@ -0,0 +1,50 @@
+"""
+Info 表的订单号索引：读一遍 Info 表，按订单号建立记录字典，替代每行切割数据都扫描一遍 Info 表
+"""
+from openpyxl.utils import column_index_from_string
+
+
+class InfoIndex:
+    """订单号 -> 记录（字段名 -> 值，另有 'row' 为 Info 表中的行号）
+
+    columns 为字段名到列字母的映射，id_column 为订单号所在的列。
+    同一订单号出现多次时使用第一行（与逐行查找第一处匹配相同），重复的订单号记录在 duplicates；
+    get() 查不到的订单号按首次查找的顺序记录在 missing。订单号为空的行不建索引。
+    """
+
+    def __init__(self, rows, columns, id_column='B', first_row=2):
+        self.records = {}
+        self.duplicates = []
+        self.missing = []
+        self._missing_seen = set()
+
+        id_index = column_index_from_string(id_column) - 1
+        field_indexes = [(field, column_index_from_string(letter) - 1) for field, letter in columns.items()]
+        duplicate_seen = set()
+        for row_number, row in enumerate(rows, first_row):
+            order_id = row[id_index] if id_index < len(row) else None
+            if order_id is None:
+                continue
+            if order_id in self.records:
+                if order_id not in duplicate_seen:
+                    duplicate_seen.add(order_id)
+                    self.duplicates.append(order_id)
+                continue
+            record = {field: row[index] if index < len(row) else None for field, index in field_indexes}
+            record['row'] = row_number
+            self.records[order_id] = record
+
+    def get(self, order_id):
+        """返回订单号对应的记录，没有时返回 None 并记入 missing"""
+        record = self.records.get(order_id)
+        if record is None and order_id is not None and order_id not in self._missing_seen:
+            self._missing_seen.add(order_id)
+            self.missing.append(order_id)
+        return record
+
+    def report(self):
+        """打印重复和缺失的订单号"""
+        if self.duplicates:
+            print(f"警告：Info 表中以下订单号重复，使用第一行: {', '.join(map(str, self.duplicates))}")
+        if self.missing:
+            print(f"警告：Info 表中找不到以下订单号: {', '.join(map(str, self.missing))}")
@@ -78,6 +78,15 @@ class LocalDevHandler(SimpleHTTPRequestHandler):
     def do_GET(self):
         """Handle GET requests for static files"""
         try:
+            if self.path == '/api/stats':
+                from api.stats import handler as StatsHandler
+
+                api_handler = StatsHandler(self.request, self.client_address, self.server)
+                for attr in ['rfile', 'wfile', 'headers', 'command', 'path', 'request_version', 'requestline']:
+                    if hasattr(self, attr):
+                        setattr(api_handler, attr, getattr(self, attr))
+                api_handler.do_GET()
+                return
             super().do_GET()
         except ConnectionAbortedError:
             # Ignore connection aborted errors (common in development)
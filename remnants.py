@@ -0,0 +1,87 @@
+"""
+余料（切剩的料头）库存，保存在本地 SQLite 数据库中
+"""
+import sqlite3
+from datetime import datetime
+
+# 默认数据库路径
+REMNANT_DB_PATH = 'remnants.db'
+
+# 短于该长度的料头不入库
+MIN_REMNANT_LENGTH = 24.0
+
+
+class RemnantStore:
+    """按 (材料, 长度) 建索引的余料库存
+
+    best_fit 用索引做范围查询，取能放下所需长度的最短余料，
+    余料数量增长到几千根时查询仍是对数复杂度。
+    取用和入库都在同一个事务中，调用 commit() 后才写入磁盘，出错时 rollback() 撤销。
+    """
+
+    def __init__(self, path=REMNANT_DB_PATH, min_length=MIN_REMNANT_LENGTH):
+        self.path = path
+        self.min_length = min_length
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS remnants ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'material TEXT NOT NULL, '
+            'length REAL NOT NULL, '
+            'created_at TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_remnants_material_length ON remnants (material, length)')
+        self._conn.commit()
+
+    def best_fit(self, material, min_length):
+        """返回长度不小于 min_length 的最短余料 (id, length)，没有则返回 None"""
+        return self._conn.execute(
+            'SELECT id, length FROM remnants WHERE material = ? AND length >= ? ORDER BY length LIMIT 1',
+            (material, min_length)
+        ).fetchone()
+
+    def take(self, remnant_id):
+        """从库存中取走一根余料"""
+        self._conn.execute('DELETE FROM remnants WHERE id = ?', (remnant_id,))
+
+    def add(self, material, length):
+        """记录一根新余料，短于 min_length 的忽略；返回是否入库"""
+        if length < self.min_length:
+            return False
+        self._conn.execute(
+            'INSERT INTO remnants (material, length, created_at) VALUES (?, ?, ?)',
+            (material, float(length), datetime.now().isoformat(timespec='seconds'))
+        )
+        return True
+
+    def list_remnants(self, material=None):
+        """列出余料 (id, material, length)，按材料和长度排序"""
+        if material is None:
+            return self._conn.execute('SELECT id, material, length FROM remnants ORDER BY material, length').fetchall()
+        return self._conn.execute(
+            'SELECT id, material, length FROM remnants WHERE material = ? ORDER BY length', (material,)
+        ).fetchall()
+
+    def count(self, material=None):
+        if material is None:
+            return self._conn.execute('SELECT COUNT(*) FROM remnants').fetchone()[0]
+        return self._conn.execute('SELECT COUNT(*) FROM remnants WHERE material = ?', (material,)).fetchone()[0]
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
@@ -1,6 +1,19 @@
+import copy
 import json
 import os
 import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # 默认设置
 DEFAULT_SETTINGS = {
@@ -21,48 +34,221 @@ DEFAULT_SETTINGS = {
 # JSON 文件路径
 JSON_FILE_PATH = 'material_settings.json'
 
+# 材料名称的前两部分，如 HMST82-01
+MATERIAL_KEY_PATTERN = re.compile(r'(HMST\d+-\d+)')
+
+# 每次写入设置时加一并保存在文件里的版本号
+VERSION_KEY = '_version'
+
+# 进程内的设置快照 (文件的 (mtime, 大小), 设置, 材料名称 -> 设置键)，整体替换，读取时不加锁；
+# 文件的 (mtime, 大小) 变化时才重新读取
+_snapshot_state = (None, None, None)
+_reload_lock = threading.Lock()
+_settings_version = 0
+# 同一进程内的写入互斥（文件锁只在进程之间互斥）
+_write_lock = threading.Lock()
+
+def _read_settings():
+    """读取设置文件；文件不存在时返回默认设置，格式错误时返回 None"""
+    if not os.path.exists(JSON_FILE_PATH):
+        return DEFAULT_SETTINGS.copy()
+    try:
+        with open(JSON_FILE_PATH, 'r') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return None
+
+def _file_signature():
+    try:
+        stat = os.stat(JSON_FILE_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _snapshot():
+    """返回 (设置快照, 该快照的材料键缓存)，文件变化时重新读取并递增版本号
+
+    文件未变化时只做一次 stat，不加锁。写入是先写临时文件再替换，读到的总是完整的文件；
+    文件被手工改坏时保留上一个快照（没有快照时用默认设置），不会静默回到默认长度。
+    """
+    global _snapshot_state, _settings_version
+    signature = _file_signature()
+    cached_signature, settings, memo = _snapshot_state
+    if settings is not None and signature == cached_signature:
+        return settings, memo
+
+    with _reload_lock:
+        cached_signature, settings, memo = _snapshot_state
+        if settings is not None and signature == cached_signature:
+            return settings, memo
+        loaded = _read_settings()
+        if loaded is None:
+            print(f"警告：{JSON_FILE_PATH} 文件格式错误，" + ("沿用上次读取的设置" if settings is not None else "使用默认设置"))
+            loaded = settings if settings is not None else DEFAULT_SETTINGS.copy()
+        _settings_version += 1
+        _snapshot_state = (signature, loaded, {})
+        return _snapshot_state[1], _snapshot_state[2]
+
+def _settings_snapshot():
+    """返回当前设置快照（只读，调用方不要修改）"""
+    return _snapshot()[0]
+
+def _invalidate_settings_cache():
+    global _snapshot_state
+    with _reload_lock:
+        _snapshot_state = (None, None, None)
+
+def settings_version():
+    """当前设置快照的版本号，设置每次重新读取后加一，下游缓存可以把它放进键里
+
+    这是进程内的计数；写入次数另存于设置文件的 VERSION_KEY 字段，所有进程一致。
+    """
+    _settings_snapshot()
+    return _settings_version
+
+@contextmanager
+def _settings_file_lock():
+    """写设置时持有的排他锁：进程之间用锁文件上的建议锁（fcntl / msvcrt），进程内用线程锁"""
+    with _write_lock:
+        with open(JSON_FILE_PATH + '.lock', 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _write_settings(settings):
+    """在持有文件锁时调用：版本号加一后写入临时文件，再原子替换设置文件"""
+    current = _read_settings() or {}
+    settings[VERSION_KEY] = max(current.get(VERSION_KEY, 0), settings.get(VERSION_KEY, 0)) + 1
+    directory = os.path.dirname(os.path.abspath(JSON_FILE_PATH))
+    fd, tmp_path = tempfile.mkstemp(prefix='.material_settings.', suffix='.tmp', dir=directory)
+    try:
+        # mkstemp 建的文件只有属主可读写，沿用原文件的权限
+        os.chmod(tmp_path, os.stat(JSON_FILE_PATH).st_mode & 0o777 if os.path.exists(JSON_FILE_PATH) else 0o644)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(settings, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, JSON_FILE_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    # 同一进程内写入后立即生效，不依赖 mtime 的精度
+    _invalidate_settings_cache()
+
+def _update_settings_file(update):
+    """在文件锁内读取最新的设置、调用 update(settings) 修改后写回，避免并发写入互相覆盖"""
+    with _settings_file_lock():
+        # 文件被改坏时以上次读取的设置为准，写回后文件即恢复
+        settings = _read_settings() or load_settings()
+        update(settings)
+        _write_settings(settings)
+
 def load_settings():
-    if os.path.exists(JSON_FILE_PATH):
-        try:
-            with open(JSON_FILE_PATH, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"警告：{JSON_FILE_PATH} 文件格式错误，使用默认设置")
-    return DEFAULT_SETTINGS.copy()
+    """返回设置的副本，可以修改后传给 save_settings"""
+    return copy.deepcopy(_settings_snapshot())
 
 def save_settings(settings):
-    with open(JSON_FILE_PATH, 'w') as f:
-        json.dump(settings, f, indent=4)
+    """整体写入设置（原子替换），settings 的 VERSION_KEY 更新为新的版本号"""
+    with _settings_file_lock():
+        _write_settings(settings)
 
-def get_material_length(material):
-    # print("get_material_length", material)
-    settings = load_settings()
-    
-    # 使用正则表达式匹配材料名称的前两部分
-    match = re.match(r'(HMST\d+-\d+)', material)
+def _resolve_material_key(material, settings):
+    match = MATERIAL_KEY_PATTERN.match(material)
     if match:
         key = match.group(1).replace('HMST', 'HMST-')
-        # print("key", key)
-        # print("match settings.get(key, settings.get('default'))", settings.get(key, settings.get('default')))
-        return settings.get(key, settings.get('default'))
-    else:
-        # print("settings.get('default')", settings.get('default'))
-        return settings.get('default')
+        if key in settings:
+            return key
+    return 'default'
+
+def get_material_key(material, settings=None):
+    """返回材料名称在设置中对应的键，未配置的材料返回 'default'"""
+    if settings is not None:
+        return _resolve_material_key(material, settings)
+
+    settings, memo = _snapshot()
+    key = memo.get(material)
+    if key is None:
+        key = _resolve_material_key(material, settings)
+        memo[material] = key
+    return key
+
+def _get_material_setting(material):
+    settings = _settings_snapshot()
+    return settings.get(get_material_key(material))
+
+def get_material_stock_options(material):
+    """返回材料可用的所有标准长度，按长度降序
+
+    设置值可以是单个长度（如 257.0），也可以是列表：
+    [{"length": 257.0, "cost": 12.5, "inventory": 40}, {"length": 233.0, "cost": 11.0}]
+    cost 缺省时按长度计（即用料长度最少），inventory 缺省或为 null 表示不限库存。
+    inventory 属于设置中的材料键：颜色后缀不同（如 -WH / -BL）但对应同一个键的材料共用这份库存。
+    """
+    setting = _get_material_setting(material)
+    if not isinstance(setting, list):
+        setting = [{'length': setting}]
+
+    options = []
+    for option in setting:
+        length = float(option['length'])
+        options.append({
+            'length': length,
+            'cost': float(option.get('cost', length)),
+            'inventory': option.get('inventory'),
+        })
+    return sorted(options, key=lambda option: option['length'], reverse=True)
+
+def get_material_length(material):
+    """返回材料的标准长度；配置了多个长度时返回最长的一个"""
+    setting = _get_material_setting(material)
+    if isinstance(setting, list):
+        return max(float(option['length']) for option in setting)
+    return setting
+
+def resolve_material_lengths(materials):
+    """按材料名称的 Series 逐行返回 (标准长度数组, 是否落到 'default' 的布尔数组)
+
+    每个不同的名称只解析一次，缺失的名称按 default 处理并标记；
+    配置了多个长度的材料取最长的一个（与 get_material_length 相同）。
+    """
+    codes, uniques = pd.factorize(pd.Series(materials))
+    # 最后一格给缺失值（编码为 -1）
+    lengths = np.empty(len(uniques) + 1, dtype=np.float64)
+    uses_default = np.ones(len(uniques) + 1, dtype=bool)
+    for i, material in enumerate(uniques):
+        uses_default[i] = get_material_key(str(material)) == 'default'
+        lengths[i] = get_material_length(str(material))
+    lengths[-1] = get_material_length('')
+    return lengths[codes], uses_default[codes]
+
+def get_material_tolerance(material):
+    """返回材料排料时合并相近长度的容差（英寸），未配置时为 0（不合并）
+
+    在设置中按材料键配置，如 "length_tolerance": {"default": 0.015625, "HMST-82-01": 0.03125}
+    """
+    tolerances = _settings_snapshot().get('length_tolerance', {})
+    return float(tolerances.get(get_material_key(material), tolerances.get('default', 0.0)))
 
 def get_last_directory(directory_type):
-    settings = load_settings()
+    settings = _settings_snapshot()
     return settings.get(f'last_{directory_type}_directory', '')
 
 def update_last_directory(directory_type, path):
-    settings = load_settings()
-    settings[f'last_{directory_type}_directory'] = path
-    save_settings(settings)
+    _update_settings_file(lambda settings: settings.__setitem__(f'last_{directory_type}_directory', path))
 
 def get_settings():
     return load_settings()
 
 def update_settings(new_settings):
-    settings = load_settings()
-    settings.update(new_settings)
-    save_settings(settings)
+    _update_settings_file(lambda settings: settings.update(new_settings))
 
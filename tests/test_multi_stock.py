@@ -0,0 +1,18 @@
+from cutting_logic import _plan_group_multi_stock, bar_remaining
+
+
+def test_piece_never_placed_on_shorter_stock():
+    # 能放下 200 的 238 只有 2 根库存，第三件 200 不能排到 160 上
+    stock_options = [{'length': 238.0, 'cost': 238.0, 'inventory': 2},
+                     {'length': 160.0, 'cost': 160.0, 'inventory': None}]
+    for deadline in (None, 0):
+        bars, bar_stock_lengths = _plan_group_multi_stock([200.0, 200.0, 200.0, 50.0], stock_options, deadline)
+        assert sorted(length for bar in bars for length in bar) == [50.0, 200.0, 200.0, 200.0]
+        assert all(bar_remaining(bar, stock_length) >= 0 for bar, stock_length in zip(bars, bar_stock_lengths))
+
+
+def test_stacked_bars_need_qty_inventory():
+    stock_options = [{'length': 257.0, 'cost': 200.0, 'inventory': 5},
+                     {'length': 233.0, 'cost': 220.0, 'inventory': None}]
+    _, bar_stock_lengths = _plan_group_multi_stock([100.0] * 10, stock_options, qty=2)
+    assert bar_stock_lengths.count(257.0) * 2 <= 5
@@ -0,0 +1,29 @@
+import os
+
+from cutting_logic import PlanCache
+
+
+def _disk_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+               if name.endswith('.json'))
+
+
+def test_disk_tier_stays_within_limit(tmp_path):
+    cache = PlanCache(directory=str(tmp_path), max_disk_bytes=20000)
+    for i in range(300):
+        cache.put(f"key{i:04d}", [[100.0 + i, 50.0]] * 5, {'bars': 5, 'deadline_hit': False})
+    assert _disk_size(tmp_path) <= 20000
+    assert cache._disk_bytes == _disk_size(tmp_path)
+    cache.clear()
+    assert cache.get('key0299') is not None
+
+
+def test_stale_temp_files_are_removed(tmp_path):
+    stale = tmp_path / 'abc.json.123.tmp'
+    stale.write_text('{')
+    os.utime(stale, (0, 0))
+    fresh = tmp_path / 'def.json.124.tmp'
+    fresh.write_text('{')
+    PlanCache(directory=str(tmp_path))
+    assert not stale.exists()
+    assert fresh.exists()
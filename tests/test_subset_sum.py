@@ -0,0 +1,45 @@
+import random
+
+from cutting_logic import (CUT_LOSS, END_TRIM, _SubsetSumState, _grid_capacity, _plan_group_greedy_subset_sum,
+                           bar_remaining, find_best_combination)
+
+
+def _used(combination):
+    return sum(length + CUT_LOSS for length in combination)
+
+
+def test_rounding_does_not_overfill():
+    # 两件 109.5004 加损耗后为 227.0008，按最近网格点取整时会被当成恰好装满
+    combination = find_best_combination([109.5004, 109.5004, 50.0], 227.0, solver='subset_sum')
+    assert _used(combination) <= 227.0
+    assert sorted(combination) == [50.0, 109.5004]
+
+
+def test_combination_never_exceeds_target():
+    rng = random.Random(0)
+    for _ in range(300):
+        target = rng.choice([227.0, 227.001, 175.0, 251.0])
+        lengths = [round(rng.uniform(20, 120), rng.choice([3, 4, 6])) for _ in range(rng.randint(1, 12))]
+        # 构造恰好超出目标一点点的组合
+        lengths.append(round(target / 2 - CUT_LOSS + rng.choice([0.0002, 0.0004, 0.0006]), 4))
+        lengths.append(lengths[-1])
+        combination = find_best_combination(lengths, target, solver='subset_sum')
+        assert _used(combination) <= target + 1e-9
+
+
+def test_incremental_state_never_overfills():
+    rng = random.Random(1)
+    for _ in range(50):
+        material_length = rng.choice([233.0, 238.0, 181.0])
+        lengths = [round(rng.uniform(20, 120), 4) for _ in range(rng.randint(48, 120))]
+        lengths += [round((material_length - END_TRIM) / 2 - CUT_LOSS + 0.0004, 4)] * 4
+        for bar in _plan_group_greedy_subset_sum(lengths, material_length):
+            assert len(bar) == 1 or bar_remaining(bar, material_length) >= 0
+
+        state = _SubsetSumState(lengths, _grid_capacity(material_length - END_TRIM), CUT_LOSS)
+        while state.remaining:
+            total = state.best_total()
+            combination = state.take(total) if total > 0 else None
+            if not combination:
+                break
+            assert _used(combination) <= material_length - END_TRIM + 1e-9
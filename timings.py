@@ -0,0 +1,97 @@
+"""
+各处理阶段的计时：单次请求的 Timings 和进程内的汇总统计
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+# CUTTING_TIMINGS=0 时关闭计时
+TIMINGS_ENABLED = os.environ.get('CUTTING_TIMINGS', '1') != '0'
+
+_NULL_TIMER = nullcontext()
+
+
+class _Timer:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Timings:
+    """一次请求中各阶段的耗时（秒），同名计时累加
+
+    关闭时 timer() 返回共用的空上下文，add() 直接返回，几乎没有开销。
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = TIMINGS_ENABLED if enabled is None else enabled
+        self._durations = OrderedDict()
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def add(self, name, seconds):
+        if not self.enabled:
+            return
+        self._durations[name] = self._durations.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        """各阶段耗时（毫秒）"""
+        return OrderedDict((name, round(seconds * 1000, 3)) for name, seconds in self._durations.items())
+
+    def server_timing_header(self):
+        """Server-Timing 响应头的值，如 'parse;dur=1.2, optimize;dur=35.0'"""
+        return ', '.join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+
+# 关闭计时时使用的共享实例
+NULL_TIMINGS = Timings(enabled=False)
+
+# 进程内各阶段的汇总：name -> [次数, 总耗时, 最大耗时]
+_aggregate = {}
+_aggregate_lock = threading.Lock()
+
+
+def record(timings):
+    """把一次请求的耗时并入汇总"""
+    if not timings.enabled:
+        return
+    with _aggregate_lock:
+        for name, seconds in timings._durations.items():
+            entry = _aggregate.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+
+def aggregate_stats():
+    """各阶段的次数、总耗时、平均和最大耗时（毫秒）"""
+    with _aggregate_lock:
+        return {
+            name: {
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'mean_ms': round(total * 1000 / count, 3),
+                'max_ms': round(longest * 1000, 3),
+            }
+            for name, (count, total, longest) in _aggregate.items()
+        }
+
+
+def reset():
+    with _aggregate_lock:
+        _aggregate.clear()